@@ -1,16 +1,34 @@
-from fastapi import FastAPI, WebSocket
-import base64
-from io import BytesIO
-from PIL import Image
-import cv2
-import numpy as np
+from fastapi import FastAPI, WebSocket, HTTPException, Header
+from fastapi.responses import FileResponse
+from typing import Optional
+import hmac
+import os
+import sys
 import asyncio
-from script import run
+
+# Frame profiling uses the matching API's profiler and profile store
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml", "matchingnoti"))
+import profiling
 
 app = FastAPI()
 
 FRAME_DELAY = 5 / 100
 
+# Same shared secret as the matching API; profiling and the admin endpoints
+# are disabled when it is not set. Only accepted as the X-Admin-Token header,
+# so it never ends up in URLs and access logs.
+ADMIN_TOKEN = os.getenv("FOODBRIDGE_ADMIN_TOKEN")
+
+# Bounded on-disk ring of frame profiles, shared by every worker process and
+# kept across restarts
+frame_profiles = profiling.ProfileStore(
+    os.getenv("FRAME_PROFILE_DIR", os.path.join("profiles", "frames")),
+    int(os.getenv("FRAME_MAX_PROFILES", "50")),
+)
+
+def is_admin(token):
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
@@ -20,17 +38,52 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     print("WebSocket Connected")
 
+    # ?profile=1 profiles every frame; ?profile_slow_ms=200 keeps only slow ones
+    params = websocket.query_params
+    mode = profiling.parse_profile_flag(params.get("profile"))
+    if not is_admin(websocket.headers.get("x-admin-token")):
+        mode = None
+    min_seconds = float(params.get("profile_slow_ms", 0)) / 1000
+
     try:
+        # The frame pipeline pulls in cv2/PIL/NumPy; load it with the first
+        # connection instead of at startup
+        from script import run
+
         while True:
             start_time = asyncio.get_event_loop().time()
             data = await websocket.receive_text()  # Receive Base64 string
             frame_data = data.replace('data:image/jpeg;base64,', '')  # Remove header
             if not frame_data:
                 continue
-            await run(frame_data,websocket)
+            if mode is None:
+                await run(frame_data,websocket)
+                continue
+            with profiling.request_profile(mode, frame_profiles, min_seconds):
+                await profiling.maybe_profile_coroutine("ws_frame", run(frame_data,websocket))
 
 
     except Exception as e:
         print(e)
     finally:
-        await websocket.close()
\ No newline at end of file
+        await websocket.close()
+
+def require_admin(x_admin_token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set FOODBRIDGE_ADMIN_TOKEN")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/profiles")
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return frame_profiles.list()
+
+@app.get("/admin/profiles/{name}")
+def download_profile(name: str, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    path = frame_profiles.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if name.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
@@ -0,0 +1,149 @@
+# artifacts.py
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import joblib
+
+ARTIFACT_ROOT = "artifacts"
+MODEL_FILENAME = "model.joblib"
+META_FILENAME = "meta.json"
+CURRENT_FILENAME = "CURRENT"
+
+
+def data_hash(path, block_size=1 << 20):
+    """
+    SHA-256 of a training data file, read in blocks so large files stay cheap
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ArtifactRegistry:
+    """
+    Versioned on-disk store of trained models.
+    Each model name gets a directory of versions keyed by the hash of the
+    data it was trained on and the hash of the saved model, so retraining on
+    the same data with other settings still yields a new version, plus a
+    CURRENT file naming the live version.
+
+    Models are written uncompressed so they can be loaded with mmap_mode='r'.
+    That only avoids a copy for models that keep the loaded numpy arrays as
+    they are; scikit-learn trees copy their node arrays into private memory
+    when unpickled, so forests are loaded normally by default.
+    """
+
+    def __init__(self, root=ARTIFACT_ROOT):
+        self.root = root
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _version_dir(self, name, version):
+        return os.path.join(self.root, name, version)
+
+    def save(self, name, model, training_hash, metadata=None):
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        # compress=0 keeps numpy arrays as raw buffers that can be memory-mapped
+        staged_path = os.path.join(model_dir, f"{MODEL_FILENAME}.{os.getpid()}.tmp")
+        joblib.dump(model, staged_path, compress=0)
+        version = f"{training_hash[:12]}-{data_hash(staged_path)[:8]}"
+
+        version_dir = self._version_dir(name, version)
+        os.makedirs(version_dir, exist_ok=True)
+        model_path = os.path.join(version_dir, MODEL_FILENAME)
+        os.replace(staged_path, model_path)
+
+        meta = {
+            "name": name,
+            "version": version,
+            "training_hash": training_hash,
+            "model_hash": version.rsplit("-", 1)[1],
+            "created_at": datetime.utcnow().isoformat(),
+            **(metadata or {})
+        }
+        _atomic_write(os.path.join(version_dir, META_FILENAME), json.dumps(meta, indent=2))
+        _atomic_write(os.path.join(self._model_dir(name), CURRENT_FILENAME), version)
+        return version
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self._model_dir(name), CURRENT_FILENAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self, name):
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(
+            v for v in os.listdir(model_dir)
+            if os.path.isfile(os.path.join(model_dir, v, MODEL_FILENAME))
+        )
+
+    def metadata(self, name, version=None):
+        version = version or self.current_version(name)
+        with open(os.path.join(self._version_dir(name, version), META_FILENAME)) as f:
+            return json.load(f)
+
+    def load(self, name, version=None, mmap_mode=None):
+        version = version or self.current_version(name)
+        if version is None:
+            raise FileNotFoundError(f"No artifact registered for '{name}'")
+        model_path = os.path.join(self._version_dir(name, version), MODEL_FILENAME)
+        return joblib.load(model_path, mmap_mode=mmap_mode)
+
+    def live(self, name, check_interval=5.0, mmap_mode=None):
+        return LiveArtifact(self, name, check_interval, mmap_mode)
+
+
+class LiveArtifact:
+    """
+    Holds the current version of a model and reloads it when CURRENT changes.
+    The version file is re-read at most once per check_interval seconds.
+    """
+
+    def __init__(self, registry, name, check_interval=5.0, mmap_mode=None):
+        self.registry = registry
+        self.name = name
+        self.check_interval = check_interval
+        self.mmap_mode = mmap_mode
+        self.version = None
+        self.model = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        version = self.registry.current_version(self.name)
+        self._checked_at = time.monotonic()
+        if version is None or version == self.version:
+            return False
+
+        with self._lock:
+            if version != self.version:
+                self.model = self.registry.load(self.name, version, self.mmap_mode)
+                self.version = version
+        return True
+
+    def get(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        if self.model is None:
+            raise FileNotFoundError(f"No artifact registered for '{self.name}'")
+        return self.model
@@ -1,37 +1,129 @@
-import pandas as pd
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from datetime import timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from features import FeaturePipeline, PIPELINE_PATH
+
+FOOD_CATEGORIES = ["Bakery", "Dairy", "Fruits", "Vegetables"]
+LOCATIONS = ["Area A", "Area B", "Area C"]
+
+#generate random dates
+DATES = pd.date_range(start="2025-01-01", periods=365, freq="D").values
+
+
+def generate_chunk(chunk_index, chunk_size, seed=42):
+    """
+    Generate one chunk of synthetic orders.
+    Each chunk has its own Generator seeded from (seed, chunk_index), so any
+    chunk can be regenerated on its own and chunks can be built in parallel.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+
+    data = {
+        "order_date": rng.choice(DATES, chunk_size),
+        "food_category": rng.choice(FOOD_CATEGORIES, chunk_size),
+        "quantity_available": rng.integers(1, 20, chunk_size),
+        "expiry_date": rng.choice(DATES, chunk_size) + np.timedelta64(3, "D"),
+        "claimed_count": rng.integers(0, 20, chunk_size),
+        "location": rng.choice(LOCATIONS, chunk_size),
+        "temperature": rng.uniform(20, 40, chunk_size),  # simulated weather
+        "price": rng.uniform(10, 50, chunk_size),  # random initial pricing
+    }
+
+    return pd.DataFrame(data)
+
+
+def _build_chunk(args):
+    chunk_index, chunk_size, seed = args
+    return generate_chunk(chunk_index, chunk_size, seed)
+
+
+def iter_chunks(tasks, workers):
+    """
+    Build chunks in order. With several workers at most 2 x workers chunks
+    are in flight, so memory stays bounded by chunk size even when writing
+    is slower than generating.
+    """
+    if workers <= 1:
+        yield from map(_build_chunk, tasks)
+        return
+    tasks = iter(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_build_chunk, task))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            chunk = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(_build_chunk, task))
+            yield chunk
+
+
+def chunk_sizes(rows, chunk_size):
+    full, rest = divmod(rows, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
 
-np.random.seed(42)
+def generate(rows=1000, chunk_size=100_000, seed=42, workers=1,
+             raw_path="orders.parquet", output_path="cleaned_orders.parquet",
+             pipeline_path=PIPELINE_PATH):
+    """
+    Two streaming passes, memory bounded by chunk size:
+    1. generate chunks, write them to raw_path, partial_fit the feature pipeline
+       on rows newer than its saved watermark
+    2. re-read raw_path one row group at a time, transform, write output_path
+    The pipeline state is persisted so later runs and serving reuse it.
+    """
+    tasks = [(i, size, seed) for i, size in enumerate(chunk_sizes(rows, chunk_size))]
+    pipeline = FeaturePipeline.load_or_create(pipeline_path)
+    fitted_until = pipeline.watermark
 
-#enerate random dates
-dates = pd.date_range(start="2025-01-01", periods=365, freq="D")
+    writer = None
+    for chunk in iter_chunks(tasks, workers):
+        pipeline.partial_fit(pipeline.unseen(chunk, fitted_until))
 
-data = {
-    "order_date": np.random.choice(dates, 1000),
-    "food_category": np.random.choice(["Vegetables", "Fruits", "Bakery", "Dairy"], 1000),
-    "quantity_available": np.random.randint(1, 20, 1000),
-    "expiry_date": pd.to_datetime(np.random.choice(dates, 1000)) + timedelta(days=3),
-    "claimed_count": np.random.randint(0, 20, 1000),
-    "location": np.random.choice(["Area A", "Area B", "Area C"], 1000),
-    "temperature": np.random.uniform(20, 40, 1000),  # simulated weather
-    "price": np.random.uniform(10, 50, 1000),  # random initial pricing
-}
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(raw_path, table.schema)
+        writer.write_table(table)
+    if writer is None:
+        print("No rows requested; nothing generated")
+        return pipeline
+    writer.close()
+    pipeline.save(pipeline_path)
+    print("Synthetic data saved!")
 
-df = pd.DataFrame(data)
-df.to_csv("orders.csv", index=False)
-print("Synthetic data saved!")
+    writer = None
+    raw = pq.ParquetFile(raw_path)
+    for i in range(raw.num_row_groups):
+        chunk = pipeline.transform(raw.read_row_group(i).to_pandas())
 
-orders = pd.read_csv("orders.csv", parse_dates=["order_date", "expiry_date"])
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
 
-orders["days_to_expiry"] = (orders["expiry_date"] - orders["order_date"]).dt.days
+    return pipeline
 
-orders = pd.get_dummies(orders, columns=["food_category", "location"], drop_first=True)
 
-from sklearn.preprocessing import MinMaxScaler
-scaler = MinMaxScaler()
-orders[["quantity_available", "claimed_count", "temperature", "price"]] = scaler.fit_transform(
-    orders[["quantity_available", "claimed_count", "temperature", "price"]]
-)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic order data")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--raw-output", default="orders.parquet")
+    parser.add_argument("--output", default="cleaned_orders.parquet")
+    parser.add_argument("--pipeline", default=PIPELINE_PATH)
+    args = parser.parse_args()
 
-orders.to_csv("cleaned_orders.csv", index=False)
\ No newline at end of file
+    generate(args.rows, args.chunk_size, args.seed, args.workers, args.raw_output, args.output,
+             args.pipeline)
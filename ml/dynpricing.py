@@ -1,18 +1,20 @@
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 import pandas as pd
-import joblib
+from artifacts import ArtifactRegistry, data_hash
 
-orders = pd.read_csv("cleaned_orders.csv")
+orders = pd.read_parquet("cleaned_orders.parquet")
 
 X = orders[["claimed_count", "days_to_expiry", "temperature"]]
 y = orders["price"]
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-model = RandomForestRegressor(n_estimators=100)
+model = RandomForestRegressor(n_estimators=100, n_jobs=-1)
 model.fit(X_train, y_train)
 
-joblib.dump(model, "pricing_model.pkl")
+registry = ArtifactRegistry()
+registry.save("pricing", model, data_hash("cleaned_orders.parquet"),
+              {"features": list(X.columns), "n_estimators": 100})
 
 import numpy as np
 import tensorflow as tf
@@ -27,11 +29,10 @@ new_food = np.expand_dims(new_food, axis=0)
 predicted_demand = model.predict(new_food)
 print("Predicted Demand:", predicted_demand)
 
-import joblib
 import numpy as np
 
-# Load pricing model
-pricing_model = joblib.load("pricing_model.pkl")
+# Load the live pricing model
+pricing_model = registry.load("pricing")
 
 # Predict price
 new_item_features = np.array([[10, 3, 30]])  # 10 claims, 3 days to expiry, 30°C
@@ -0,0 +1,157 @@
+# features.py
+import json
+import os
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ["quantity_available", "claimed_count", "temperature", "price"]
+CATEGORICAL_COLUMNS = ["food_category", "location"]
+TIME_COLUMN = "order_date"
+PIPELINE_PATH = "feature_pipeline.json"
+
+# unseen() default: filter against the pipeline's own current watermark
+CURRENT_WATERMARK = object()
+
+
+class FeaturePipeline:
+    """
+    Persistent feature transform shared by training and serving.
+    Category vocabularies only ever grow (new values are appended), so the
+    one-hot column layout is stable across runs, and min/max statistics are
+    updated batch by batch with partial_fit instead of refitting on all data.
+
+    Unlike the earlier get_dummies(drop_first=True) output, every category
+    gets a column and columns follow first appearance rather than sorted
+    order, so models trained on the old layout must be retrained.
+    """
+
+    def __init__(self, numeric_columns=NUMERIC_COLUMNS, categorical_columns=CATEGORICAL_COLUMNS,
+                 time_column=TIME_COLUMN):
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.time_column = time_column
+        self.vocabulary = {col: [] for col in self.categorical_columns}
+        self.data_min = {}
+        self.data_max = {}
+        self.rows_seen = 0
+        self.watermark = None  # latest time_column value fitted so far
+
+    @property
+    def one_hot_columns(self):
+        return [f"{col}_{value}" for col in self.categorical_columns for value in self.vocabulary[col]]
+
+    def unseen(self, frame, watermark=CURRENT_WATERMARK):
+        """
+        Rows newer than anything already fitted. Pass the watermark taken
+        before a run (None when nothing was fitted) to keep filtering against
+        it while the run's own partial_fit calls move self.watermark forward.
+        """
+        if watermark is CURRENT_WATERMARK:
+            watermark = self.watermark
+        if watermark is None or self.time_column not in frame:
+            return frame
+        return frame[frame[self.time_column] > pd.Timestamp(watermark)]
+
+    def partial_fit(self, frame):
+        if not len(frame):
+            return self  # min/max of nothing would be NaN
+
+        for col in self.categorical_columns:
+            known = set(self.vocabulary[col])
+            for value in frame[col].dropna().unique():
+                value = str(value)
+                if value not in known:
+                    self.vocabulary[col].append(value)
+                    known.add(value)
+
+        for col in self.numeric_columns:
+            col_min = float(frame[col].min())
+            col_max = float(frame[col].max())
+            self.data_min[col] = min(col_min, self.data_min.get(col, col_min))
+            self.data_max[col] = max(col_max, self.data_max.get(col, col_max))
+
+        if self.time_column in frame:
+            latest = pd.Timestamp(frame[self.time_column].max())
+            if self.watermark is None or latest > pd.Timestamp(self.watermark):
+                self.watermark = latest.isoformat()
+
+        self.rows_seen += len(frame)
+        return self
+
+    def _offset_span(self, columns):
+        offset = np.zeros(len(columns))
+        span = np.ones(len(columns))
+        for i, col in enumerate(columns):
+            if col in self.data_min:
+                offset[i] = self.data_min[col]
+                # Constant columns scale to 0, matching MinMaxScaler
+                span[i] = (self.data_max[col] - self.data_min[col]) or 1.0
+        return offset, span
+
+    def scale(self, values, columns):
+        """
+        Min-max scale a raw (..., len(columns)) array whose last axis follows `columns`.
+        Columns without fitted statistics pass through unchanged.
+        """
+        offset, span = self._offset_span(columns)
+        return (np.asarray(values, dtype=np.float64) - offset) / span
+
+    def unscale(self, values, columns):
+        """Inverse of scale, e.g. to turn a model's scaled output back into raw units"""
+        offset, span = self._offset_span(columns)
+        return np.asarray(values, dtype=np.float64) * span + offset
+
+    def transform(self, frame):
+        frame = frame.copy()
+
+        if "expiry_date" in frame and "order_date" in frame:
+            frame["days_to_expiry"] = (frame["expiry_date"] - frame["order_date"]).dt.days
+
+        frame[self.numeric_columns] = self.scale(frame[self.numeric_columns].to_numpy(), self.numeric_columns)
+
+        for col in self.categorical_columns:
+            categories = pd.Categorical(frame.pop(col), categories=self.vocabulary[col])
+            codes = categories.codes
+            for i, value in enumerate(self.vocabulary[col]):
+                frame[f"{col}_{value}"] = codes == i
+
+        return frame
+
+    def to_dict(self):
+        return {
+            "numeric_columns": self.numeric_columns,
+            "categorical_columns": self.categorical_columns,
+            "time_column": self.time_column,
+            "vocabulary": self.vocabulary,
+            "data_min": self.data_min,
+            "data_max": self.data_max,
+            "rows_seen": self.rows_seen,
+            "watermark": self.watermark,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        pipeline = cls(state["numeric_columns"], state["categorical_columns"], state["time_column"])
+        pipeline.vocabulary = state["vocabulary"]
+        pipeline.data_min = state["data_min"]
+        pipeline.data_max = state["data_max"]
+        pipeline.rows_seen = state["rows_seen"]
+        pipeline.watermark = state["watermark"]
+        return pipeline
+
+    def save(self, path=PIPELINE_PATH):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=PIPELINE_PATH):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def load_or_create(cls, path=PIPELINE_PATH):
+        if os.path.exists(path):
+            return cls.load(path)
+        return cls()
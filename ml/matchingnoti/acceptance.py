@@ -0,0 +1,103 @@
+# acceptance.py
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import Claim, Donation, OrganizationCategoryAcceptance
+
+# Claim statuses that count as the organization accepting the donation
+ACCEPTED_STATUSES = {"accepted", "completed"}
+
+# Older claims count half as much every HALF_LIFE_DAYS
+HALF_LIFE_DAYS = 30.0
+
+
+def decay_factor(since, now):
+    if since is None:
+        return 1.0
+    elapsed_days = (now - since).total_seconds() / 86400.0
+    return 0.5 ** (max(elapsed_days, 0.0) / HALF_LIFE_DAYS)
+
+
+def _find_stat(session, organization_id, category):
+    # Rows added earlier in the same flush are pending and not yet in the identity map
+    for obj in session.new:
+        if (isinstance(obj, OrganizationCategoryAcceptance)
+                and obj.organization_id == organization_id and obj.category == category):
+            return obj
+    return session.get(OrganizationCategoryAcceptance, (organization_id, category))
+
+
+def apply_claim_event(session, organization_id, category, claims_delta, accepts_delta, now=None):
+    """
+    Decay an (organization, category) statistic to `now` and add the new event.
+    Both counters decay by the same factor, so the ratio read back is the
+    time-weighted acceptance rate without any further work at read time.
+    """
+    now = now or datetime.utcnow()
+    stat = _find_stat(session, organization_id, category)
+    if stat is None:
+        stat = OrganizationCategoryAcceptance(
+            organization_id=organization_id,
+            category=category,
+            decayed_claims=0.0,
+            decayed_accepts=0.0,
+        )
+        session.add(stat)
+
+    factor = decay_factor(stat.updated_at, now)
+    stat.decayed_claims = max(stat.decayed_claims * factor + claims_delta, 0.0)
+    stat.decayed_accepts = max(stat.decayed_accepts * factor + accepts_delta, 0.0)
+    stat.acceptance_rate = (
+        min(1.0, stat.decayed_accepts / stat.decayed_claims) if stat.decayed_claims > 0 else None
+    )
+    stat.updated_at = now
+    return stat
+
+
+@event.listens_for(Claim.status, "set", active_history=True)
+def load_previous_status(target, value, oldvalue, initiator):
+    # active_history makes SQLAlchemy load the old status before it is replaced,
+    # even when the claim was expired by a commit, so before_flush sees the transition
+    pass
+
+
+@event.listens_for(Session, "before_flush")
+def track_claim_status(session, flush_context, instances):
+    """
+    Keep acceptance statistics in step with claims in the same transaction:
+    new claims add to the claim count, and status transitions into or out
+    of an accepted state adjust the accept count.
+    """
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Claim):
+            accepted = obj.status in ACCEPTED_STATUSES
+            events.append((obj, 1.0, 1.0 if accepted else 0.0))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Claim):
+            continue
+        history = get_history(obj, "status")
+        if not history.deleted or not history.added:
+            continue
+        was_accepted = history.deleted[0] in ACCEPTED_STATUSES
+        is_accepted = history.added[0] in ACCEPTED_STATUSES
+        if was_accepted != is_accepted:
+            events.append((obj, 0.0, 1.0 if is_accepted else -1.0))
+
+    if not events:
+        return
+
+    with session.no_autoflush:
+        donation_ids = {claim.donation_id for claim, _, _ in events}
+        categories = dict(
+            session.query(Donation.id, Donation.category).filter(Donation.id.in_(donation_ids)).all()
+        )
+        now = datetime.utcnow()
+        for claim, claims_delta, accepts_delta in events:
+            category = categories.get(claim.donation_id)
+            if claim.recipient_organization_id is None or category is None:
+                continue
+            apply_claim_event(session, claim.recipient_organization_id, category,
+                              claims_delta, accepts_delta, now)
@@ -1,18 +1,37 @@
 # api.py
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, status
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response, WebSocket, status
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from sqlalchemy import bindparam
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional, Dict
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, ValidationError, validator
 from datetime import datetime, timedelta
+import asyncio
+import hmac
 import logging
 import json
-from geopy.distance import geodesic
+import os
+import time
 from matching_engine import MatchingEngine
+from snapshot import haversine_km
+from jobqueue import get_queue
+import ingest
+import metrics
+import notification_counters
+import profiling
+import push
+import response_cache
+import search
+import serialization
+import tasks
 
 # Database setup
 from database import SessionLocal, engine
-from models import Base, User, Organization, Donation, Claim, Notification, \
+from models import Base, User, Organization, Donation, DonationAllergen, Claim, Notification, \
     FoodCategoryPreference, DietaryRestriction, AllergenRestriction
 
 # Configure logging
@@ -28,6 +47,146 @@ app = FastAPI(
     redoc_url="/api/redoc"
 )
 
+# Shared secret for admin endpoints and on-demand profiling; both are
+# disabled when it is not set
+ADMIN_TOKEN = os.getenv("FOODBRIDGE_ADMIN_TOKEN")
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+class ProfilingRoute(APIRoute):
+    """Route whose endpoint is profiled when the request asks for it"""
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiling.profiled(endpoint, endpoint.__name__), **kwargs)
+
+app.router.route_class = ProfilingRoute
+
+# Time SQL statements issued on behalf of sampled requests
+metrics.instrument_engine(engine)
+
+# Feeds new notifications to push subscribers (see push.py)
+notification_broker = push.create_broker(SessionLocal)
+
+@app.on_event("startup")
+async def start_notification_broker():
+    await notification_broker.start()
+
+@app.on_event("shutdown")
+async def stop_notification_broker():
+    await notification_broker.stop()
+
+# GET routes whose rendered responses are cached: path -> tags of the path params
+CACHED_ROUTES = {
+    "/organizations/{org_id}": lambda params: [
+        response_cache.organization_tag(params["org_id"])
+    ],
+    "/organizations/{org_id}/matches": lambda params: [
+        response_cache.organization_tag(params["org_id"]), response_cache.DONATIONS_TAG
+    ],
+}
+
+def match_cached_route(scope):
+    for route in app.router.routes:
+        if getattr(route, "path", None) in CACHED_ROUTES:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return route, child_scope
+    return None, None
+
+def cached_response(entry, if_none_match, hit):
+    headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache", "X-Cache": "HIT" if hit else "MISS"}
+    if response_cache.etag_matches(if_none_match, entry["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry["body"], status_code=entry["status"], media_type=entry["media_type"], headers=headers)
+
+# Registered before the other middleware so it runs innermost: cache hits
+# are still timed, labelled and profiled like any other request
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    """
+    Serve cached GET responses for CACHED_ROUTES, keyed by path and query
+    parameters, with ETag/If-None-Match revalidation. Entries are
+    invalidated by the write paths through response_cache's tags.
+    """
+    if request.method != "GET":
+        return await call_next(request)
+    route, child_scope = match_cached_route(request.scope)
+    if route is None:
+        return await call_next(request)
+    
+    key = request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    tags = CACHED_ROUTES[route.path](child_scope["path_params"])
+    versioned_key, entry = await run_in_threadpool(response_cache.cache.lookup, key, tags)
+    
+    # Profiled requests and explicit no-cache requests always run the endpoint
+    bypass = (profiling.parse_profile_flag(
+        request.headers.get("x-profile") or request.query_params.get("profile")
+    ) is not None and is_admin(request.headers.get("x-admin-token"))) or \
+        "no-cache" in request.headers.get("cache-control", "")
+    if entry is not None and not bypass:
+        request.scope.update(child_scope)  # so metrics label the hit by route
+        return cached_response(entry, request.headers.get("if-none-match"), hit=True)
+    
+    response = await call_next(request)
+    if response.status_code != status.HTTP_200_OK:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    entry = {
+        "body": body.decode(),
+        "etag": response_cache.etag_for(body),
+        "status": response.status_code,
+        "media_type": response.media_type or response.headers.get("content-type", "application/json"),
+    }
+    await run_in_threadpool(response_cache.cache.store, versioned_key, entry)
+    return cached_response(entry, request.headers.get("if-none-match"), hit=False)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-endpoint latency and SQL statistics for sampled requests"""
+    started = time.perf_counter()
+    with metrics.track_request() as stats:
+        response = await call_next(request)
+    if stats is not None:
+        # Label by route template so /organizations/1 and /organizations/2 share a series
+        route = request.scope.get("route")
+        endpoint = route.path if route else "unmatched"
+        metrics.observe_request(request.method, endpoint, response.status_code,
+                                time.perf_counter() - started, stats)
+    return response
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Profile a single request when it carries an X-Profile header or a
+    ?profile= query flag ("1", "cprofile" or "sampling") together with the
+    admin token. Only one request is profiled at a time per process.
+    """
+    mode = profiling.parse_profile_flag(
+        request.headers.get("x-profile") or request.query_params.get("profile")
+    )
+    if mode is None or not is_admin(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    
+    with profiling.request_profile(mode) as profile:
+        response = await call_next(request)
+    if profile.saved:
+        response.headers["X-Profile-Ids"] = ",".join(profile.saved)
+    elif profile.skipped:
+        response.headers["X-Profile-Skipped"] = "busy"
+    return response
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled; set FOODBRIDGE_ADMIN_TOKEN"
+        )
+    if not is_admin(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
@@ -51,7 +210,8 @@ class OrganizationBase(BaseModel):
     state: str
     zip_code: str
     location: Coordinates
-    org_type: str = Field(..., pattern=r"^(shelter|food_bank|community_center|school|other)$")    capacity_kg: float = Field(..., gt=0)
+    org_type: str = Field(..., pattern=r"^(shelter|food_bank|community_center|school|other)$")
+    capacity_kg: float = Field(..., gt=0)
     operating_hours: Dict[str, str]  # {"monday": "9am-5pm", ...}
     storage_options: Dict[str, bool] = {
         "refrigeration": False,
@@ -104,6 +264,8 @@ class DonationCreate(DonationBase):
     pass
 
 class DonationResponse(DonationBase):
+    # The donor's geocoded location; null when the donor could not be located
+    location: Optional[Coordinates]
     id: int
     status: str = Field(..., regex="^(available|claimed|expired|picked_up)$")
     created_at: datetime
@@ -140,37 +302,26 @@ class NotificationResponse(NotificationBase):
     class Config:
         orm_mode = True
 
+class IdRange(BaseModel):
+    first: int
+    last: int
+
+    @validator("last")
+    def validate_range(cls, v, values):
+        if "first" in values and v < values["first"]:
+            raise ValueError("Range last must not be before first")
+        return v
+
+class MarkReadRequest(BaseModel):
+    ids: List[int] = Field([], max_items=1000)
+    ranges: List[IdRange] = Field([], max_items=100)
+    before_id: Optional[int]
+
 class MatchResult(BaseModel):
     donation: DonationResponse
-    organization: OrganizationResponse
     match_score: float
     score_details: Dict[str, float]
 
-# --------------------------
-# Background Tasks
-# --------------------------
-
-def process_donation_matches(donation_id: int, db: Session):
-    try:
-        engine = MatchingEngine(db)
-        engine.process_new_donation(donation_id)
-        logger.info(f"Processed matches for donation {donation_id}")
-    except Exception as e:
-        logger.error(f"Error processing donation {donation_id}: {str(e)}")
-
-def expire_donations(db: Session):
-    try:
-        now = datetime.utcnow()
-        expired = db.query(Donation).filter(
-            Donation.status == "available",
-            Donation.pickup_window_end < now
-        ).update({"status": "expired"})
-        db.commit()
-        logger.info(f"Expired {expired} donations")
-    except Exception as e:
-        logger.error(f"Error expiring donations: {str(e)}")
-        db.rollback()
-
 # --------------------------
 # API Endpoints
 # --------------------------
@@ -182,7 +333,6 @@ def expire_donations(db: Session):
          tags=["Organizations"])
 async def create_organization(
     organization: OrganizationCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Create a new organization profile with storage capabilities and preferences"""
@@ -192,11 +342,8 @@ async def create_organization(
         db.commit()
         db.refresh(db_org)
         
-        # Schedule initial matching
-        background_tasks.add_task(
-            MatchingEngine(db).match_existing_donations,
-            db_org.id
-        )
+        # Queue initial matching for a worker
+        tasks.enqueue_organization_matching(db_org.id)
         
         return db_org
     except SQLAlchemyError as e:
@@ -226,7 +373,6 @@ def get_organization(org_id: int, db: Session = Depends(get_db)):
          tags=["Donations"])
 async def create_donation(
     donation: DonationCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Create a new food donation listing"""
@@ -236,9 +382,9 @@ async def create_donation(
         db.commit()
         db.refresh(db_donation)
         
-        # Trigger matching and expiration checks
-        background_tasks.add_task(process_donation_matches, db_donation.id, db)
-        background_tasks.add_task(expire_donations, db)
+        # Queue matching and expiration checks for the workers
+        tasks.enqueue_donation_matching([db_donation.id])
+        tasks.enqueue_expiration()
         
         return db_donation
     except SQLAlchemyError as e:
@@ -249,6 +395,96 @@ async def create_donation(
             detail="Error creating donation"
         )
 
+def insert_donation_batch(donor_organization_id: int, rows: List[dict], allergens: List[List[str]]):
+    """Insert validated donations and their allergens in one transaction; returns the new ids"""
+    db = SessionLocal()
+    try:
+        if db.query(Organization.id).filter(Organization.id == donor_organization_id).first() is None:
+            return None
+        # return_defaults fills in each row's id from a batched INSERT ... RETURNING
+        db.bulk_insert_mappings(Donation, rows, return_defaults=True)
+        db.bulk_insert_mappings(DonationAllergen, [
+            {"donation_id": row["id"], "allergen": allergen}
+            for row, donation_allergens in zip(rows, allergens)
+            for allergen in donation_allergens
+        ])
+        db.commit()
+        return [row["id"] for row in rows]
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@app.post("/donations/bulk",
+         tags=["Donations"])
+async def bulk_create_donations(request: Request, donor_organization_id: int):
+    """
+    Create many donations from an NDJSON (application/x-ndjson) or CSV
+    (text/csv) upload. Rows are validated as they stream in; valid rows are
+    inserted together and matched in one batched job. Invalid rows are
+    reported by row number without aborting the rest.
+    """
+    records = ingest.records_for(request.headers.get("content-type"), request.stream())
+    if records is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Upload NDJSON (application/x-ndjson) or CSV (text/csv)"
+        )
+    
+    now = datetime.utcnow()
+    rows, allergens, errors = [], [], []
+    received = 0
+    async for row_number, record in records:
+        received = row_number
+        if row_number > ingest.MAX_ROWS:
+            errors.append({"row": row_number, "errors": [{"loc": [], "msg": f"more than {ingest.MAX_ROWS} rows"}]})
+            break
+        if isinstance(record, ingest.RowError):
+            errors.append({"row": row_number, "errors": record.errors})
+            continue
+        try:
+            donation = DonationCreate(**record)
+        except ValidationError as e:
+            errors.append({"row": row_number, "errors": [
+                {"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()
+            ]})
+            continue
+        row, donation_allergens = ingest.donation_rows(donation, donor_organization_id, now)
+        rows.append(row)
+        allergens.append(donation_allergens)
+    
+    donation_ids = []
+    job_id = None
+    if rows:
+        try:
+            donation_ids = await run_in_threadpool(insert_donation_batch, donor_organization_id, rows, allergens)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in bulk donation upload: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error creating donations"
+            )
+        if donation_ids is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Donor organization not found"
+            )
+        # Bulk inserts skip session events, so invalidate cached matches here
+        response_cache.cache.invalidate([response_cache.DONATIONS_TAG])
+        # One matching job and one expiration sweep for the whole upload
+        job_id = tasks.enqueue_batch_matching(donation_ids)
+        tasks.enqueue_expiration()
+    
+    return {
+        "received": received,
+        "created": len(donation_ids),
+        "donation_ids": donation_ids,
+        "error_count": len(errors),
+        "errors": errors[:ingest.MAX_ERRORS],
+        "matching_job_id": job_id
+    }
+
 @app.get("/donations/available",
         response_model=List[DonationResponse],
         tags=["Donations"])
@@ -263,27 +499,68 @@ def get_available_donations(
     limit: int = 100
 ):
     """Get available donations with optional filters"""
-    query = db.query(Donation).filter(Donation.status == "available")
+    query = serialization.select_donations().where(Donation.status == "available")
     
     if category:
-        query = query.filter(Donation.category == category)
+        query = query.where(Donation.category == category)
         
     if min_quantity:
-        query = query.filter(Donation.quantity >= min_quantity)
-        
-    if max_distance and lat and lon:
-        # Simple distance filtering (for demonstration)
-        donations = query.all()
-        filtered = []
-        for donation in donations:
-            donor_loc = (donation.location["latitude"], donation.location["longitude"])
-            org_loc = (lat, lon)
-            distance = geodesic(donor_loc, org_loc).kilometers
-            if distance <= max_distance:
-                filtered.append(donation)
-        return filtered
+        query = query.where(Donation.quantity >= min_quantity)
+    
+    # A donation is located at its donor organization
+    snapshot = MatchingEngine(db).organization_snapshot()
+    locate = serialization.snapshot_locator(snapshot)
         
-    return query.offset(skip).limit(limit).all()
+    if max_distance is not None and lat is not None and lon is not None:
+        # Donor locations are geocoded, not stored, so the radius becomes a
+        # donor id filter and ordering and paging stay in SQL. The ids are
+        # rendered inline as integers: one bind variable each would overrun
+        # SQLite's variable limit in dense areas.
+        nearby = haversine_km(lat, lon, snapshot.latitude, snapshot.longitude) <= max_distance
+        query = query.where(Donation.donor_organization_id.in_(
+            bindparam("nearby_donor_ids", snapshot.ids[nearby].tolist(), expanding=True, literal_execute=True)
+        ))
+
+    rows = db.execute(query.order_by(Donation.id).offset(skip).limit(limit)).all()
+    
+    allergens = serialization.allergens_by_donation(db, [row.id for row in rows])
+    return serialization.FastJSONResponse(serialization.donation_documents(rows, allergens, locate))
+
+@app.get("/donations/search",
+        response_model=List[DonationResponse],
+        tags=["Donations"])
+def search_donations(
+    q: str = Query(..., min_length=1, max_length=200),
+    donation_status: str = Query("available", alias="status", regex="^(available|claimed|expired|picked_up)$"),
+    category: Optional[str] = None,
+    max_distance: Optional[float] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100
+):
+    """Full-text search over donation titles, subcategories and descriptions, best matches first"""
+    words = search.terms(q)
+    if not words:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Search query has no words"
+        )
+    conditions = [Donation.status == donation_status]
+    if category:
+        conditions.append(Donation.category == category)
+
+    snapshot = MatchingEngine(db).organization_snapshot()
+    if max_distance is not None and lat is not None and lon is not None:
+        # Donor locations are geocoded, not stored, so the radius becomes a donor id filter
+        nearby = haversine_km(lat, lon, snapshot.latitude, snapshot.longitude) <= max_distance
+        conditions.append(Donation.donor_organization_id.in_(snapshot.ids[nearby].tolist()))
+
+    rows = search.search_donations(db, words, *conditions, skip=skip, limit=limit)
+    allergens = serialization.allergens_by_donation(db, [row.id for row in rows])
+    locate = serialization.snapshot_locator(snapshot)
+    return serialization.FastJSONResponse(serialization.donation_documents(rows, allergens, locate))
 
 @app.post("/claims/",
          response_model=ClaimResponse,
@@ -328,7 +605,7 @@ def get_organization_matches(
     min_score: float = 0.5,
     limit: int = 20
 ):
-    """Get best matches for an organization"""
+    """Get best matches for an organization, best first"""
     org = db.query(Organization).get(org_id)
     if not org:
         raise HTTPException(
@@ -337,19 +614,25 @@ def get_organization_matches(
         )
     
     engine = MatchingEngine(db)
-    matches = engine.get_organization_matches(org_id, min_score, limit)
+    matches = [match for match in engine.find_matches_for_organization(org_id, limit)
+               if match["match_score"] >= min_score]
+    
+    rows = db.execute(serialization.select_donations().where(
+        Donation.id.in_([match["donation_id"] for match in matches])
+    )).all()
+    allergens = serialization.allergens_by_donation(db, [row.id for row in rows])
+    locate = serialization.snapshot_locator(engine.organization_snapshot())
+    documents = {document["id"]: document for document in serialization.donation_documents(rows, allergens, locate)}
     
-    return [{
-        "donation": match.donation,
-        "organization": org,
-        "match_score": match.score,
+    return serialization.FastJSONResponse([{
+        "donation": documents[match["donation_id"]],
+        "match_score": match["match_score"],
         "score_details": {
-            "category": match.category_score,
-            "capacity": match.capacity_score,
-            "timing": match.timing_score,
-            "distance": match.distance_score
+            "category": float(match["category_score"]),
+            "distance": float(match["distance_score"]),
+            "storage": float(match["storage_score"])
         }
-    } for match in matches]
+    } for match in matches])
 
 @app.get("/organizations/{org_id}/notifications",
         response_model=List[NotificationResponse],
@@ -362,30 +645,135 @@ def get_notifications(
     limit: int = 50
 ):
     """Get organization notifications"""
-    query = db.query(Notification).filter(
+    query = serialization.select_notifications().where(
         Notification.organization_id == org_id
     )
     
     if unread_only:
-        query = query.filter(Notification.is_read == False)
-        
-    return query.order_by(Notification.created_at.desc()
-                         ).offset(skip).limit(limit).all()
+        query = query.where(Notification.is_read == False)
+    
+    rows = db.execute(query.order_by(Notification.created_at.desc()).offset(skip).limit(limit))
+    return serialization.FastJSONResponse(serialization.notification_documents(rows))
+
+def subscribe_notifications(org_id: int, last_id: Optional[int]):
+    """
+    Subscribe to an organization's notifications, then replay whatever it
+    missed since last_id. Subscribing first means nothing falls in between.
+    """
+    subscription = push.hub.subscribe(org_id, last_id or 0)
+    if last_id is None:
+        return subscription, None
+    return subscription, push.replay_backlog(SessionLocal, subscription)
+
+@app.get("/organizations/{org_id}/notifications/stream",
+        tags=["Notifications"])
+async def stream_notifications(
+    org_id: int,
+    request: Request,
+    last_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of new notifications. Reconnecting clients
+    resume from the Last-Event-ID header (or ?last_id=).
+    """
+    if last_id is None and last_event_id and last_event_id.isdigit():
+        last_id = int(last_event_id)
+    subscription, backlog = subscribe_notifications(org_id, last_id)
+    
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is not None:
+                async for event in backlog:
+                    yield push.format_sse(event)
+            async for event in subscription.events():
+                if await request.is_disconnected():
+                    break
+                yield push.format_sse(event)
+        finally:
+            push.hub.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/organizations/{org_id}/notifications/ws")
+async def notifications_websocket(websocket: WebSocket, org_id: int, last_id: Optional[int] = None):
+    """WebSocket push of new notifications, resuming after ?last_id="""
+    await websocket.accept()
+    subscription, backlog = subscribe_notifications(org_id, last_id)
+    
+    async def send_events():
+        if backlog is not None:
+            async for event in backlog:
+                await websocket.send_json({"type": "notification", "notification": event})
+        async for event in subscription.events():
+            if event is None:
+                await websocket.send_json({"type": "heartbeat"})
+            else:
+                await websocket.send_json({"type": "notification", "notification": event})
+        # The client fell too far behind; it should reconnect with its last id
+        await websocket.close(code=1013)
+    
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    # Stop as soon as either side is done, e.g. the client disconnected while idle
+    running = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_disconnect())]
+    try:
+        await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        push.hub.unsubscribe(subscription)
+
+@app.get("/organizations/{org_id}/notifications/unread-count",
+        tags=["Notifications"])
+def get_unread_count(org_id: int, db: Session = Depends(get_db)):
+    """Unread notification count for badges, read from the maintained counter"""
+    return {"organization_id": org_id, "unread": notification_counters.unread_count(db, org_id)}
+
+@app.post("/organizations/{org_id}/notifications/mark-read",
+         tags=["Notifications"])
+def mark_notifications_read(org_id: int, selection: MarkReadRequest, db: Session = Depends(get_db)):
+    """
+    Mark many notifications read in one UPDATE: explicit ids, inclusive id
+    ranges and/or everything up to before_id (the newest id the client saw)
+    """
+    where = notification_counters.id_selection(
+        selection.ids, [(r.first, r.last) for r in selection.ranges], selection.before_id
+    )
+    if where is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Give ids, ranges or before_id"
+        )
+    try:
+        marked = notification_counters.mark_read(db, Notification.organization_id == org_id, where)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error marking notifications read: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error marking notifications read"
+        )
+    return {"marked_read": marked[org_id], "unread": notification_counters.unread_count(db, org_id)}
 
 @app.put("/notifications/{notification_id}/read",
         status_code=status.HTTP_204_NO_CONTENT,
         tags=["Notifications"])
 def mark_notification_read(notification_id: int, db: Session = Depends(get_db)):
     """Mark notification as read"""
-    notification = db.query(Notification).get(notification_id)
-    if not notification:
+    marked = notification_counters.mark_read(db, Notification.id == notification_id)
+    db.commit()
+    if not marked and db.query(Notification.id).filter(Notification.id == notification_id).first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
-    
-    notification.is_read = True
-    db.commit()
     return
 
 # --------------------------
@@ -394,25 +782,71 @@ def mark_notification_read(notification_id: int, db: Session = Depends(get_db)):
 
 @app.post("/maintenance/expire-donations",
          tags=["Maintenance"])
-async def trigger_expiration(background_tasks: BackgroundTasks,
-                           db: Session = Depends(get_db)):
+async def trigger_expiration():
     """Manually trigger donation expiration check"""
-    background_tasks.add_task(expire_donations, db)
-    return {"status": "Expiration process started"}
+    job_id = tasks.enqueue_expiration()
+    return {"status": "Expiration process queued", "job_id": job_id}
+
+@app.post("/maintenance/rebuild-unread-counters",
+         tags=["Maintenance"],
+         dependencies=[Depends(require_admin)])
+def rebuild_unread_counters(db: Session = Depends(get_db)):
+    """Recount unread notifications per organization from scratch"""
+    notification_counters.rebuild(db)
+    return {"status": "Unread counters rebuilt"}
+
+@app.post("/maintenance/archive",
+         tags=["Maintenance"],
+         dependencies=[Depends(require_admin)])
+async def trigger_archival():
+    """Queue moving old donations, claims and notifications to the archive"""
+    job_id = tasks.enqueue_archival()
+    return {"status": "Archival queued", "job_id": job_id}
 
 @app.post("/maintenance/match-all",
          tags=["Maintenance"])
-async def trigger_full_matching(background_tasks: BackgroundTasks,
-                              db: Session = Depends(get_db)):
+def trigger_full_matching(db: Session = Depends(get_db)):
     """Trigger full matching process for all donations"""
-    donations = db.query(Donation).filter(
+    donation_ids = [donation_id for donation_id, in db.query(Donation.id).filter(
         Donation.status == "available"
-    ).all()
+    )]
     
-    for donation in donations:
-        background_tasks.add_task(process_donation_matches, donation.id, db)
+    # Donations already waiting for a worker coalesce into their queued job
+    queued = [job_id for job_id in tasks.enqueue_donation_matching(donation_ids) if job_id is not None]
     
-    return {"status": f"Matching triggered for {len(donations)} donations"}
+    return {"status": f"Matching queued for {len(queued)} of {len(donation_ids)} donations"}
+
+@app.get("/metrics",
+        tags=["Maintenance"])
+def get_metrics():
+    """Prometheus-format metrics"""
+    metrics.observe_job_queue(get_queue())
+    return Response(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+# --------------------------
+# Admin Endpoints
+# --------------------------
+
+@app.get("/admin/profiles",
+        tags=["Admin"],
+        dependencies=[Depends(require_admin)])
+def list_profiles():
+    """List stored request profiles, newest first"""
+    return profiling.store.list()
+
+@app.get("/admin/profiles/{name}",
+        tags=["Admin"],
+        dependencies=[Depends(require_admin)])
+def download_profile(name: str):
+    """Download a stored profile (pstats or speedscope JSON)"""
+    path = profiling.store.path(name)
+    if not path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    media_type = "application/json" if name.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
 
 if __name__ == "__main__":
     import uvicorn
@@ -423,10 +857,10 @@ from fastapi import APIRouter
 router = APIRouter()
 
 @router.post("/notifications/generate")
-async def generate_notifications(background_tasks: BackgroundTasks):
+async def generate_notifications():
     """Trigger notification generation"""
-    background_tasks.add_task(NotificationEngine(SessionLocal()).generate_notifications)
-    return {"status": "Notification generation started"}
+    job_id = tasks.enqueue_notification_generation()
+    return {"status": "Notification generation queued", "job_id": job_id}
 
 @router.get("/users/{user_id}/notifications", response_model=List[NotificationResponse])
 def get_user_notifications(user_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,170 @@
+# archive.py
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, func, literal, Integer, Float, Boolean, DateTime
+from models import Donation, DonationAllergen, Claim, Notification, ARCHIVE_TABLES
+from lazy import optional_import
+import notification_counters
+import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Rows older than this move out of the hot tables
+RETENTION_DAYS = float(os.getenv("FOODBRIDGE_ARCHIVE_RETENTION_DAYS", "90"))
+BATCH_SIZE = int(os.getenv("FOODBRIDGE_ARCHIVE_BATCH_SIZE", "1000"))
+# "tables" for the *_archive tables, or a directory for compressed Parquet files
+ARCHIVE_TARGET = os.getenv("FOODBRIDGE_ARCHIVE_TARGET", "tables")
+
+# update_matching_model reads the last 30 days of claims from the hot table
+MIN_RETENTION_DAYS = 30
+
+ARCHIVED_DONATION_STATUSES = ("expired", "completed", "picked_up", "claimed")
+SETTLED_CLAIM_STATUSES = ("completed", "canceled", "cancelled")
+
+
+def archivable(cutoff):
+    """
+    Hot table -> condition for rows old enough and finished, in the order
+    they are moved. Read notifications and settled claims move on their
+    own; a donation takes every claim, notification and allergen row that
+    refers to it along, whatever their state, since nothing can act on
+    them once the donation is gone.
+    """
+    return [
+        (Notification.__table__, (Notification.is_read == True) & (Notification.created_at < cutoff)),
+        (Claim.__table__, Claim.status.in_(SETTLED_CLAIM_STATUSES) & (Claim.claimed_at < cutoff)),
+        (Donation.__table__, Donation.status.in_(ARCHIVED_DONATION_STATUSES)
+            & (Donation.available_until < cutoff)),
+    ]
+
+
+# Rows of these tables follow their parent row into the archive; the
+# archive tables have no foreign keys, so the order within a batch is free
+DEPENDENTS = {
+    "donations": [
+        (DonationAllergen.__table__, DonationAllergen.donation_id),
+        (Claim.__table__, Claim.donation_id),
+        (Notification.__table__, Notification.donation_id),
+    ],
+}
+
+
+class TableArchive:
+    """Moves rows into the *_archive tables with INSERT ... SELECT, inside the batch's transaction"""
+
+    def write(self, db, table, where, archived_at):
+        archive = ARCHIVE_TABLES[table.name]
+        columns = [c.name for c in table.columns]
+        db.execute(insert(archive).from_select(
+            columns + ["archived_at"],
+            select(*table.columns, literal(archived_at, DateTime)).where(where)
+        ))
+
+
+class ParquetArchive:
+    """
+    Writes each batch to <directory>/<table>/<first id>-<last id>.parquet
+    with zstd compression; a directory reads back as one pyarrow dataset.
+    Files are written before the batch commits, so a retried batch
+    overwrites its own file instead of duplicating rows. The *_history
+    views only see hot rows then; analytics read the dataset for the rest.
+    """
+
+    ARROW_TYPES = {Integer: "int64", Float: "float64", Boolean: "bool_", DateTime: "timestamp"}
+
+    def __init__(self, directory):
+        self.pa = optional_import("pyarrow")
+        self.pq = optional_import("pyarrow.parquet")
+        if self.pa is None:
+            raise ImportError("pyarrow is required to archive to Parquet")
+        self.directory = directory
+
+    def schema(self, table):
+        fields = []
+        for column in table.columns:
+            kind = next((arrow for sql, arrow in self.ARROW_TYPES.items() if isinstance(column.type, sql)), "string")
+            fields.append((column.name, self.pa.timestamp("us") if kind == "timestamp" else getattr(self.pa, kind)()))
+        fields.append(("archived_at", self.pa.timestamp("us")))
+        return self.pa.schema(fields)
+
+    def write(self, db, table, where, archived_at):
+        rows = [dict(row._mapping, archived_at=archived_at)
+                for row in db.execute(select(*table.columns).where(where).order_by(table.c.id))]
+        if not rows:
+            return
+        directory = os.path.join(self.directory, table.name)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{rows[0]['id']:012d}-{rows[-1]['id']:012d}.parquet")
+        self.pq.write_table(self.pa.Table.from_pylist(rows, schema=self.schema(table)), path, compression="zstd")
+
+
+def create_target(spec=ARCHIVE_TARGET):
+    return TableArchive() if spec == "tables" else ParquetArchive(spec)
+
+
+def _move(db, target, table, where, archived_at):
+    """Copy rows to the archive and delete them from the hot table; returns rows moved"""
+    target.write(db, table, where, archived_at)
+    if table is Notification.__table__:
+        # Core deletes skip the flush events that keep unread counters in step
+        unread = db.execute(
+            select(Notification.organization_id, func.count())
+            .where(where, Notification.is_read == False)
+            .group_by(Notification.organization_id)
+        ).all()
+        notification_counters.apply_unread_deltas(db.connection(), {org_id: -n for org_id, n in unread})
+    return db.execute(delete(table).where(where)).rowcount
+
+
+def archive(db, retention_days=RETENTION_DAYS, batch_size=BATCH_SIZE, target=None, now=None):
+    """
+    Move finished rows older than the retention window out of the hot
+    tables, batch_size rows per transaction. Returns {table: rows moved}.
+    """
+    if retention_days < MIN_RETENTION_DAYS:
+        raise ValueError(f"Retention must be at least {MIN_RETENTION_DAYS} days; matching reads that much history")
+    target = target or create_target()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=retention_days)
+
+    moved = {}
+    for table, condition in archivable(cutoff):
+        moved[table.name] = 0
+        while True:
+            ids = db.execute(select(table.c.id).where(condition).order_by(table.c.id).limit(batch_size)).scalars().all()
+            if not ids:
+                break
+            try:
+                for dependent, key in DEPENDENTS.get(table.name, []):
+                    moved[dependent.name] = moved.get(dependent.name, 0) + _move(db, target, dependent, key.in_(ids), now)
+                _move(db, target, table, table.c.id.in_(ids), now)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            moved[table.name] += len(ids)
+            logger.info(f"Archived {len(ids)} rows from {table.name}")
+
+    # Core deletes skip session events; archived donations drop out of cached listings
+    if moved.get("donations"):
+        response_cache.cache.invalidate([response_cache.DONATIONS_TAG])
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old donations, claims and notifications to the archive")
+    parser.add_argument("--retention-days", type=float, default=RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--target", default=ARCHIVE_TARGET,
+                        help='"tables" for the *_archive tables, or a directory for Parquet files')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(archive(db, args.retention_days, args.batch_size, create_target(args.target)))
+    finally:
+        db.close()
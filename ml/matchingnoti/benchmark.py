@@ -0,0 +1,269 @@
+# benchmark.py
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from models import Base, Organization, Donation, Claim, FoodCategoryPreference, \
+    AllergenRestriction, DonationAllergen, FoodCategory, AllergenType
+from matching_engine import MatchingEngine
+
+ORG_TYPES = ["food_bank", "shelter", "community_kitchen", "school"]
+STORAGE_REQUIREMENTS = ["room_temperature", "refrigerated", "frozen", "dry"]
+CLAIM_STATUSES = ["pending", "accepted", "completed", "canceled"]
+UNITS = ["kg", "items", "servings"]
+
+
+class QueryCounter:
+    """
+    Counts SQL statements executed on an engine since the last reset()
+    """
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def seed_database(path, organizations=100, donations=500, preferences=3, allergens=1,
+                  claims=1000, seed=42):
+    """
+    Create a fresh SQLite database filled with synthetic marketplace data.
+    preferences and allergens are per-organization counts.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+
+    categories = [c.value for c in FoodCategory]
+    allergen_types = [a.value for a in AllergenType]
+
+    # Organization 1 is the donor for every donation
+    db.bulk_insert_mappings(Organization, [{
+        "id": i + 1,
+        "name": f"Organization {i + 1}",
+        "address": f"{i + 1} Main St",
+        "city": "San Francisco",
+        "state": "CA",
+        "zip_code": "94103",
+        "org_type": "donor" if i == 0 else ORG_TYPES[i % len(ORG_TYPES)],
+        "has_refrigeration": bool(rng.random() < 0.6),
+        "has_freezer": bool(rng.random() < 0.4),
+        "has_dry_storage": bool(rng.random() < 0.8),
+        "storage_capacity_kg": float(rng.uniform(50, 2000)),
+        "max_pickup_distance_km": 20.0,
+        "acceptance_rate": float(rng.random()),
+    } for i in range(organizations)])
+
+    db.bulk_insert_mappings(FoodCategoryPreference, [{
+        "organization_id": org_id,
+        "category": category,
+        "preference_level": int(rng.integers(1, 11)),
+    } for org_id in range(2, organizations + 1)
+      for category in rng.choice(categories, min(preferences, len(categories)), replace=False)])
+
+    db.bulk_insert_mappings(AllergenRestriction, [{
+        "organization_id": org_id,
+        "allergen": allergen,
+    } for org_id in range(2, organizations + 1)
+      for allergen in rng.choice(allergen_types, min(allergens, len(allergen_types)), replace=False)])
+
+    db.bulk_insert_mappings(Donation, [{
+        "id": i + 1,
+        "title": f"Donation {i + 1}",
+        "quantity": float(rng.uniform(1, 100)),
+        "unit": UNITS[i % len(UNITS)],
+        "category": categories[int(rng.integers(len(categories)))],
+        "expiration_date": now + timedelta(days=int(rng.integers(0, 14))),
+        "is_perishable": bool(rng.random() < 0.7),
+        "storage_requirements": STORAGE_REQUIREMENTS[int(rng.integers(len(STORAGE_REQUIREMENTS)))],
+        "available_from": now,
+        "available_until": now + timedelta(days=7),
+        "status": "available",
+        "donor_organization_id": 1,
+        "created_at": now,
+    } for i in range(donations)])
+
+    db.bulk_insert_mappings(DonationAllergen, [{
+        "donation_id": donation_id,
+        "allergen": allergen_types[int(rng.integers(len(allergen_types)))],
+    } for donation_id in range(1, donations + 1) if rng.random() < 0.3])
+
+    db.bulk_insert_mappings(Claim, [{
+        "donation_id": int(rng.integers(1, donations + 1)),
+        "recipient_organization_id": int(rng.integers(2, organizations + 1)),
+        "status": CLAIM_STATUSES[int(rng.integers(len(CLAIM_STATUSES)))],
+        "claimed_at": now - timedelta(days=int(rng.integers(0, 45))),
+    } for _ in range(claims)])
+
+    db.commit()
+    db.close()
+    return engine
+
+
+def measure(name, fn, counter, repeat, reset=None):
+    """
+    Run fn `repeat` times, recording latency percentiles and SQL statements
+    per call, then once more under tracemalloc for the peak Python memory
+    of one call, so tracing does not inflate the latencies. reset() runs
+    untimed before every call to give it the same starting state. A failing
+    call aborts the run: a report with a step missing is not comparable.
+    """
+    latencies = []
+    counter.reset()
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    queries = counter.count
+
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "name": name,
+        "repeat": repeat,
+        "queries_per_call": queries / repeat,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p95": float(np.percentile(latencies_ms, 95)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "max": float(latencies_ms.max()),
+        },
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def run_scale_point(path, organizations, donations, preferences, allergens, claims, repeat, seed):
+    engine = seed_database(path, organizations, donations, preferences, allergens, claims, seed)
+    engine.dispose()
+    pristine_path = f"{path}.seeded"
+    shutil.copyfile(path, pristine_path)
+    counter = QueryCounter(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def restore():
+        # Operations such as create_notifications_for_donation commit, so
+        # every call starts from a fresh copy of the seeded database. The
+        # engine is kept, so per-engine caches like the snapshot stay warm.
+        engine.dispose()
+        shutil.copyfile(pristine_path, path)
+
+    def with_session(fn):
+        # Fresh session per call so identity-map caching doesn't hide query costs
+        def run():
+            db = Session()
+            try:
+                return fn(db)
+            finally:
+                db.rollback()
+                db.close()
+        return run
+
+    donation_id = 1
+    organization_id = 2
+    results = [
+        measure("find_matches_for_donation",
+                with_session(lambda db: MatchingEngine(db).find_matches_for_donation(donation_id)),
+                counter, repeat, restore),
+        measure("find_matches_for_organization",
+                with_session(lambda db: MatchingEngine(db).find_matches_for_organization(organization_id)),
+                counter, repeat, restore),
+        measure("create_notifications_for_donation",
+                with_session(lambda db: MatchingEngine(db).create_notifications_for_donation(donation_id)),
+                counter, repeat, restore),
+        measure("update_matching_model",
+                with_session(lambda db: MatchingEngine(db).update_matching_model()),
+                counter, repeat, restore),
+        # Notifications for every available donation in one batched pass, as
+        # the match_donations job runs it. NotificationEngine's
+        # generate_notifications needs precomputed embeddings and user
+        # activity the schema does not have, so it cannot run here.
+        measure("notification_sweep",
+                with_session(lambda db: MatchingEngine(db).create_notifications_for_donations(
+                    list(range(1, donations + 1)))),
+                counter, repeat, restore),
+    ]
+    engine.dispose()
+    os.remove(pristine_path)
+
+    return {
+        "organizations": organizations,
+        "donations": donations,
+        "preferences_per_org": preferences,
+        "allergens_per_org": allergens,
+        "claims": claims,
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the matching and notification engines")
+    parser.add_argument("--organizations", default="100,500",
+                        help="comma-separated organization counts, one scale point each")
+    parser.add_argument("--donations-per-org", type=float, default=5.0)
+    parser.add_argument("--claims-per-org", type=float, default=10.0)
+    parser.add_argument("--preferences", type=int, default=3)
+    parser.add_argument("--allergens", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default="benchmark.db")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    scale_points = []
+    for organizations in (int(n) for n in args.organizations.split(",")):
+        print(f"Benchmarking {organizations} organizations...")
+        scale_points.append(run_scale_point(
+            args.db,
+            organizations,
+            int(organizations * args.donations_per_org),
+            args.preferences,
+            args.allergens,
+            int(organizations * args.claims_per_org),
+            args.repeat,
+            args.seed,
+        ))
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "seed": args.seed,
+        "scale_points": scale_points,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
@@ -0,0 +1,108 @@
+# benchmark_serialization.py
+import argparse
+import json
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker, selectinload
+from models import Donation
+from matching_engine import MatchingEngine
+from lazy import optional_import
+from benchmark import QueryCounter, seed_database, measure, git_commit
+import serialization
+from api import DonationResponse
+
+
+def orm_body(db, locate):
+    """The response_model path: ORM objects -> pydantic models -> jsonable_encoder -> json"""
+    donations = db.query(Donation).options(selectinload(Donation.allergens)).filter(
+        Donation.status == "available"
+    ).order_by(Donation.id).all()
+    models = [DonationResponse(
+        title=d.title,
+        description=d.description,
+        quantity=d.quantity,
+        unit=d.unit,
+        category=d.category,
+        expiration_date=d.expiration_date,
+        storage_requirements=d.storage_requirements,
+        pickup_window_start=d.available_from,
+        pickup_window_end=d.available_until,
+        location=locate(d.donor_organization_id),
+        allergens=[a.allergen for a in d.allergens],
+        id=d.id,
+        status=d.status,
+        created_at=d.created_at,
+        updated_at=d.created_at,
+    ) for d in donations]
+    # What fastapi's JSONResponse does with the encoded models
+    return json.dumps(jsonable_encoder(models), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def column_body(db, locate, dumps):
+    """The fast path used by /donations/available"""
+    rows = db.execute(serialization.select_donations().where(
+        Donation.status == "available"
+    ).order_by(Donation.id)).all()
+    allergens = serialization.allergens_by_donation(db, [row.id for row in rows])
+    return dumps(serialization.donation_documents(rows, allergens, locate))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark serializing large donation listings")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--organizations", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default="benchmark_serialization.db")
+    parser.add_argument("--output", default="benchmark_serialization_results.json")
+    args = parser.parse_args()
+
+    engine = seed_database(args.db, args.organizations, args.rows, claims=0, seed=args.seed)
+    with engine.begin() as conn:
+        # The synthetic data uses units and storage values the API schema rejects
+        conn.execute(text("UPDATE donations SET unit = 'kg', storage_requirements = 'refrigerated'"))
+    counter = QueryCounter(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    locate = serialization.snapshot_locator(MatchingEngine(db).organization_snapshot())
+
+    def fresh(fn):
+        # Empty identity map per call so the ORM path pays its full loading cost
+        def run():
+            db.expunge_all()
+            return fn()
+        return run
+
+    paths = {
+        "orm_pydantic_json": fresh(lambda: orm_body(db, locate)),
+        "columns_stdlib_json": fresh(lambda: column_body(db, locate, serialization.stdlib_dumps)),
+    }
+    if optional_import("orjson") is not None:
+        paths["columns_orjson"] = fresh(lambda: column_body(db, locate, serialization.dumps))
+    else:
+        print("orjson is not installed; skipping the orjson path")
+
+    # Every path must produce the same documents
+    expected = json.loads(paths["orm_pydantic_json"]())
+    for name, fn in paths.items():
+        assert json.loads(fn()) == expected, f"{name} does not match the response_model output"
+
+    results = []
+    for name, fn in paths.items():
+        result = measure(name, fn, counter, args.repeat)
+        result["rows_per_second"] = args.rows / (result["latency_ms"]["p50"] / 1000)
+        results.append(result)
+        print(f"{name:22s} p50 {result['latency_ms']['p50']:8.1f} ms  {result['rows_per_second']:10.0f} rows/s")
+    db.close()
+    engine.dispose()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "rows": args.rows,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
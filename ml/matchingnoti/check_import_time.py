@@ -0,0 +1,67 @@
+# check_import_time.py
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold import budget per entry point, in milliseconds of `python -X importtime`
+# cumulative time; generous enough for slow CI machines
+BUDGETS_MS = {
+    "api": 750,
+    "tasks": 600,
+    "worker": 150,
+}
+
+# Must not be imported at startup; they load lazily on first use
+DEFERRED_MODULES = ("pandas", "sklearn", "scipy", "geopy", "numba", "pyinstrument", "tensorflow")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module, repeat=3):
+    """
+    Import a module in fresh interpreters. Returns the median cumulative
+    import time in ms and the deferred modules it loaded.
+    """
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            cwd=HERE, capture_output=True, text=True, check=True
+        )
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and parts[2] == module:
+                timings.append(int(parts[1]) / 1000)
+        loaded = [m for m in result.stdout.strip().split(",") if m]
+    return statistics.median(timings), loaded
+
+
+def check(budgets, repeat=3):
+    failures = []
+    for module, budget in budgets.items():
+        elapsed, loaded = measure_import(module, repeat)
+        status = "ok" if elapsed <= budget and not loaded else "FAIL"
+        print(f"{module:10s} {elapsed:8.1f} ms  budget {budget:6.0f} ms  {status}"
+              + (f"  eagerly loaded: {', '.join(loaded)}" if loaded else ""))
+        if status == "FAIL":
+            failures.append(module)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when importing the service entry points regresses")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=float(os.getenv("FOODBRIDGE_IMPORT_BUDGET_SCALE", "1.0")),
+                        help="multiply every budget, e.g. 2 on slow machines")
+    args = parser.parse_args()
+
+    budgets = {module: budget * args.scale for module, budget in BUDGETS_MS.items()}
+    sys.exit(1 if check(budgets, args.repeat) else 0)
@@ -0,0 +1,68 @@
+# check_job_profiling.py
+import argparse
+import os
+import pstats
+import sys
+import tempfile
+from sqlalchemy.orm import sessionmaker
+from benchmark import seed_database
+from jobqueue import get_queue
+import profiling
+import tasks
+
+# Methods a profiled match_donation job must report timings for
+EXPECTED_METHODS = ("create_notifications_for_donation", "find_matches_for_donation")
+
+
+def method_timings(path):
+    """function name -> (calls, cumulative seconds) from a stored pstats profile"""
+    stats = pstats.Stats(path)
+    return {name: (calls, cumulative)
+            for (_, _, name), (_, calls, _, cumulative, _) in stats.stats.items()}
+
+
+def check(directory):
+    failures = []
+    engine = seed_database(os.path.join(directory, "profiling.db"), organizations=50, donations=20)
+    tasks.SessionLocal.configure(bind=engine)
+    profiling.store = profiling.ProfileStore(os.path.join(directory, "profiles"))
+
+    # Jobs queued while a request is profiled carry the flag
+    queue = get_queue(f"sqlite:///{os.path.join(directory, 'jobs.db')}")
+    with profiling.request_profile("cprofile"):
+        tasks.enqueue_donation_matching([1], queue)
+    tasks.enqueue_donation_matching([2], queue)
+    jobs = [queue.claim("check") for _ in range(2)]
+    flags = [job.payload.get(tasks.PROFILE_KEY) for job in jobs]
+    print(f"queued payload flags {flags}  " + ("ok" if flags == ["cprofile", None] else "FAIL"))
+    if flags != ["cprofile", None]:
+        failures.append("payload flag")
+
+    profiled, plain = (tasks.run_job(job) for job in jobs)
+    stored = len(profiling.store.list())
+    print(f"profiles stored {stored}  " + ("ok" if plain is None and stored == 1 else "FAIL"))
+    if plain is not None or stored != 1:
+        failures.append("unprofiled job")
+    if profiled is None or len(profiled.saved) != 1:
+        print(f"profiled job saved {None if profiled is None else profiled.saved}  FAIL")
+        return failures + ["saved profile"]
+
+    name = profiled.saved[0]
+    timings = method_timings(profiling.store.path(name))
+    print(name)
+    for method in EXPECTED_METHODS:
+        calls, cumulative = timings.get(method, (0, 0.0))
+        status = "ok" if calls else "FAIL"
+        print(f"  {method:36s} {calls:4d} calls {cumulative * 1000:8.1f} ms  {status}")
+        if not calls:
+            failures.append(method)
+    engine.dispose()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when a job asking for a profile does not produce one")
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sys.exit(1 if check(directory) else 0)
@@ -0,0 +1,78 @@
+# check_response_cache.py
+import argparse
+import os
+import sys
+import tempfile
+from sqlalchemy.orm import sessionmaker
+from benchmark import seed_database
+
+ORGANIZATION_ID = 2
+ROUTE = f"/organizations/{ORGANIZATION_ID}/matches"
+
+
+def check(directory):
+    """
+    Request an organization's matches three times: the second request must
+    be a cache hit with the same body, and the third, after a donation is
+    claimed, a miss with a different body
+    """
+    # The API's own engine points at ./foodmatch.db; keep it inside the temp directory
+    os.chdir(directory)
+    from fastapi.testclient import TestClient
+    from models import Donation
+    import api
+
+    engine = seed_database(os.path.join(directory, "cache.db"), organizations=50, donations=20)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def session():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    api.app.dependency_overrides[api.get_db] = session
+    client = TestClient(api.app)
+
+    first = client.get(ROUTE)
+    second = client.get(ROUTE)
+
+    # A donation write through the ORM invalidates the donations tag on commit
+    db = Session()
+    matched_id = first.json()[0]["donation"]["id"] if first.status_code == 200 and first.json() else None
+    if matched_id is not None:
+        db.get(Donation, matched_id).status = "claimed"
+        db.commit()
+    db.close()
+    third = client.get(ROUTE)
+    engine.dispose()
+
+    steps = [
+        ("first request", first, "MISS"),
+        ("repeat", second, "HIT"),
+        ("after donation claimed", third, "MISS"),
+    ]
+    failures = []
+    for label, response, expected in steps:
+        cache = response.headers.get("x-cache")
+        ok = response.status_code == 200 and cache == expected
+        print(f"{label:24s} {response.status_code} X-Cache {cache}  {'ok' if ok else 'FAIL'}")
+        if not ok:
+            failures.append(label)
+
+    matches = [m["donation"]["id"] for m in third.json()] if third.status_code == 200 else None
+    ok = second.content == first.content and matched_id is not None and matched_id not in (matches or [])
+    print(f"{'bodies':24s} {len(first.json()) if first.status_code == 200 else '-'} matches, "
+          f"claimed donation {matched_id} dropped  {'ok' if ok else 'FAIL'}")
+    if not ok:
+        failures.append("bodies")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when cached match listings are not served or not invalidated")
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sys.exit(1 if check(directory) else 0)
@@ -0,0 +1,84 @@
+# check_scoring_parity.py
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+from benchmark import seed_database
+from models import Organization, Donation, FoodCategoryPreference
+from matching_engine import MatchingEngine, CATEGORY, STORAGE, ALLERGEN, HISTORICAL, CAPACITY
+from scoring import SUB_SCORES
+
+# Sub-score column -> scalar scorer it must agree with. Distance is left
+# out: the scalar scorer geocodes through geopy, the kernel uses haversine.
+SCALAR_SCORERS = {
+    SUB_SCORES.index("perishability"): lambda engine, donation, org: engine.calculate_perishability_score(donation),
+    CATEGORY: lambda engine, donation, org: engine.calculate_category_match_score(donation, org),
+    STORAGE: lambda engine, donation, org: engine.calculate_storage_compatibility_score(donation, org),
+    ALLERGEN: lambda engine, donation, org: engine.calculate_allergen_compatibility_score(donation, org),
+    HISTORICAL: lambda engine, donation, org: engine.calculate_historical_acceptance_score(org, donation.category),
+    CAPACITY: lambda engine, donation, org: engine.calculate_capacity_score(donation, org),
+}
+
+
+def seed(path, organizations, donations):
+    """Benchmark data plus the preference edge cases: level 0 and organizations without preferences"""
+    engine = seed_database(path, organizations=organizations, donations=donations)
+    db = sessionmaker(bind=engine)()
+    preferences = db.query(FoodCategoryPreference).order_by(FoodCategoryPreference.id).all()
+    for preference in preferences[::4]:
+        preference.preference_level = 0
+    db.query(FoodCategoryPreference).filter(
+        FoodCategoryPreference.organization_id.in_(range(2, organizations + 1, 5))
+    ).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+    return engine
+
+
+def check(directory, organizations=40, donations=60):
+    engine = seed(os.path.join(directory, "parity.db"), organizations, donations)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    matching = MatchingEngine(db)
+
+    donations = db.query(Donation).order_by(Donation.id).all()
+    orgs = db.query(Organization).order_by(Organization.id).all()
+    snapshot = matching.organization_snapshot()
+    features = matching.donation_features(snapshot, donations)
+    donation_index = np.repeat(np.arange(len(donations)), len(orgs))
+    rows = np.tile([snapshot.row(org.id) for org in orgs], len(donations))
+    vectorized = matching.score_pairs(snapshot, features, donation_index, rows)
+
+    failures = []
+    for column, scorer in SCALAR_SCORERS.items():
+        scalar = np.array([scorer(matching, donations[d], orgs[i % len(orgs)])
+                           for i, d in enumerate(donation_index)], dtype=np.float64)
+        mismatched = int((~np.isclose(vectorized[:, column], scalar)).sum())
+        status = "ok" if not mismatched else "FAIL"
+        print(f"{SUB_SCORES[column]:14s} {len(scalar):6d} pairs {mismatched:6d} mismatched  {status}")
+        if mismatched:
+            failures.append(SUB_SCORES[column])
+
+    # Level 0 must score 0, which the category hard filter drops
+    levels = {(p.organization_id, p.category): p.preference_level for p in db.query(FoodCategoryPreference)}
+    level_zero = np.array([levels.get((orgs[i % len(orgs)].id, donations[d].category)) == 0
+                           for i, d in enumerate(donation_index)])
+    dropped = bool(level_zero.any()) and bool(np.all(vectorized[level_zero, CATEGORY] == 0))
+    print(f"{'level 0':14s} {int(level_zero.sum()):6d} pairs, all scored 0  {'ok' if dropped else 'FAIL'}")
+    if not dropped:
+        failures.append("level 0")
+
+    db.close()
+    engine.dispose()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when the vectorized sub-scores disagree with the scalar scorers")
+    parser.add_argument("--organizations", type=int, default=40)
+    parser.add_argument("--donations", type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sys.exit(1 if check(directory, args.organizations, args.donations) else 0)
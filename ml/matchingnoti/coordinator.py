@@ -0,0 +1,104 @@
+# coordinator.py
+import logging
+import os
+from collections import defaultdict
+from contextlib import nullcontext
+from database import SessionLocal
+from models import Organization, Donation
+from jobqueue import get_queue
+from regions import Region, shard_for
+import profiling
+import snapshot
+import tasks
+
+logger = logging.getLogger(__name__)
+
+# Regional sharding is off with a single shard. With more, a coordinator
+# moves matching jobs from the main queue to the queue of the shard owning
+# the donation's (or organization's) geohash cell
+SHARDS = int(os.getenv("FOODBRIDGE_SHARDS", "1"))
+SHARD_PRECISION = int(os.getenv("FOODBRIDGE_SHARD_PRECISION", "3"))  # ~156 km cells
+SHARD_QUEUE = os.getenv("FOODBRIDGE_SHARD_QUEUE", "sqlite:///./jobs-shard-{shard}.db")
+
+# Job kinds that depend on location and run on shard workers
+ROUTED_KINDS = ("match_donation", "match_donations", "match_organization")
+
+
+def shard_queue_url(shard):
+    return SHARD_QUEUE.format(shard=shard)
+
+
+def start_shard(shard, shards=SHARDS, precision=SHARD_PRECISION):
+    """Limit this process's organization snapshots to a shard's region; returns its queue URL"""
+    snapshot.set_region(Region(shard, shards, precision))
+    return shard_queue_url(shard)
+
+
+class Coordinator:
+    """
+    Routes matching jobs to shards. Every shard's snapshot also holds the
+    organizations within pickup range of its cells, so each job only needs
+    the one shard that owns its location.
+    """
+
+    def __init__(self, db, shards=SHARDS, precision=SHARD_PRECISION):
+        # Imported here: the same geocoder the shards' snapshots use
+        from matching_engine import MatchingEngine
+        self.db = db
+        self.shards = shards
+        self.precision = precision
+        self.geocode = MatchingEngine(db).get_geocoordinates
+
+    def organization_shards(self, organization_ids):
+        """organization id -> owning shard"""
+        if not organization_ids:
+            return {}
+        return {
+            org.id: shard_for(*self.geocode(org.address, org.city, org.state, org.zip_code),
+                              self.shards, self.precision)
+            for org in self.db.query(
+                Organization.id, Organization.address, Organization.city, Organization.state, Organization.zip_code
+            ).filter(Organization.id.in_(set(organization_ids)))
+        }
+
+    def donation_shards(self, donation_ids):
+        """shard -> donation ids; donations of unknown donors go to shard 0"""
+        donors = dict(self.db.query(Donation.id, Donation.donor_organization_id).filter(
+            Donation.id.in_(donation_ids)
+        ))
+        shards = self.organization_shards([donor for donor in donors.values() if donor is not None])
+        by_shard = defaultdict(list)
+        for donation_id in donation_ids:
+            by_shard[shards.get(donors.get(donation_id), 0)].append(donation_id)
+        return by_shard
+
+    def route(self, kind, payload):
+        """Enqueue a matching job on its shard(s); returns {shard: job id}"""
+        if kind == "match_organization":
+            organization_id = payload["organization_id"]
+            shard = self.organization_shards([organization_id]).get(organization_id, 0)
+            return {shard: tasks.enqueue_organization_matching(organization_id, get_queue(shard_queue_url(shard)))}
+        if kind == "match_donation":
+            donation_id = payload["donation_id"]
+            (shard, _), = self.donation_shards([donation_id]).items()
+            return {shard: tasks.enqueue_donation_matching([donation_id], get_queue(shard_queue_url(shard)))[0]}
+        if kind == "match_donations":
+            # A bulk upload is split into one batched job per shard
+            return {
+                shard: tasks.enqueue_batch_matching(donation_ids, get_queue(shard_queue_url(shard)))
+                for shard, donation_ids in self.donation_shards(payload["donation_ids"]).items()
+            }
+        raise ValueError(f"Job kind {kind!r} is not routed to shards")
+
+
+def route_job(job, shards=SHARDS, precision=SHARD_PRECISION):
+    """Job runner for the coordinator: forwards a claimed job instead of running it"""
+    # Forwarded jobs keep the profile flag: the enqueue helpers add it back
+    mode = profiling.parse_profile_flag(job.payload.get(tasks.PROFILE_KEY))
+    db = SessionLocal()
+    try:
+        with profiling.request_profile(mode) if mode else nullcontext():
+            routed = Coordinator(db, shards, precision).route(job.kind, job.payload)
+        logger.info(f"Routed job {job.id} ({job.kind}) to shards {sorted(routed)}")
+    finally:
+        db.close()
@@ -0,0 +1,118 @@
+# ingest.py
+import codecs
+import csv
+import json
+
+MAX_ROWS = 10000  # rows accepted per bulk upload
+MAX_ERRORS = 1000  # per-row errors reported back
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json")
+CSV_TYPES = ("text/csv", "application/csv")
+
+# CSV cells holding nested or list fields of the donation schema
+CSV_LIST_SEPARATOR = ";"
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+async def iter_lines(chunks, encoding="utf-8"):
+    """Decode a byte stream into lines (without line endings) as chunks arrive"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.rstrip("\r"):
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_records(lines):
+    """Yield (row_number, record or RowError) for every non-blank line"""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            yield row, record
+        except ValueError as e:
+            yield row, RowError([{"loc": [], "msg": f"invalid JSON: {e}"}])
+
+
+async def iter_csv_records(lines):
+    """
+    Yield (row_number, record or RowError) for every CSV record after the
+    header. Quoted fields may span lines. Empty cells are left out so
+    schema defaults apply; latitude/longitude become the location object
+    and allergens is a ;-separated list.
+    """
+    header = None
+    row = 0
+    buffered = []
+    async for line in lines:
+        buffered.append(line)
+        text = "\n".join(buffered)
+        if text.count('"') % 2:
+            continue  # inside a quoted field that continues on the next line
+        buffered = []
+        if not text.strip():
+            continue
+        cells = next(csv.reader([text]))
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+
+        row += 1
+        if len(cells) != len(header):
+            yield row, RowError([{"loc": [], "msg": f"expected {len(header)} columns, got {len(cells)}"}])
+            continue
+        record = {name: value for name, value in zip(header, cells) if value != ""}
+        if "latitude" in record or "longitude" in record:
+            record["location"] = {"latitude": record.pop("latitude", None),
+                                  "longitude": record.pop("longitude", None)}
+        if "allergens" in record:
+            record["allergens"] = [a.strip() for a in record["allergens"].split(CSV_LIST_SEPARATOR) if a.strip()]
+        yield row, record
+
+    if buffered:
+        yield row + 1, RowError([{"loc": [], "msg": "unterminated quoted field"}])
+
+
+def records_for(content_type, chunks):
+    """Pick the record parser from the request Content-Type"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    lines = iter_lines(chunks)
+    if media_type in CSV_TYPES:
+        return iter_csv_records(lines)
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson_records(lines)
+    return None
+
+
+def donation_rows(donation, donor_organization_id, created_at):
+    """Donations table row and allergen values for one validated DonationCreate"""
+    row = {
+        "title": donation.title,
+        "description": donation.description,
+        "quantity": donation.quantity,
+        "unit": donation.unit,
+        "category": donation.category,
+        "expiration_date": donation.expiration_date,
+        "storage_requirements": donation.storage_requirements,
+        "available_from": donation.pickup_window_start,
+        "available_until": donation.pickup_window_end,
+        "status": "available",
+        "donor_organization_id": donor_organization_id,
+        "created_at": created_at,
+    }
+    return row, list(dict.fromkeys(donation.allergens))
@@ -0,0 +1,263 @@
+# jobqueue.py
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+# Queue location; the scheme selects the backend
+JOB_QUEUE_URL = os.getenv("FOODBRIDGE_JOB_QUEUE", "sqlite:///./jobs.db")
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_VISIBILITY_TIMEOUT = 300  # seconds a claimed job stays invisible to other workers
+RETRY_BASE_DELAY = 2.0  # seconds, doubled on each failed attempt
+JOB_RETENTION_SECONDS = 7 * 24 * 3600  # finished jobs older than this are purged
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    def __init__(self, id, kind, payload, attempts, max_attempts, worker=None):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.worker = worker  # the worker holding this claim
+
+    def __repr__(self):
+        return f"Job(id={self.id}, kind={self.kind!r}, attempts={self.attempts})"
+
+
+class JobQueue(abc.ABC):
+    """
+    Backend interface for the durable job queue.
+
+    Jobs with the same dedupe_key coalesce while one of them is still
+    queued, so a burst of updates to one donation runs matching once.
+    A claimed job is invisible to other workers until its visibility
+    timeout passes; if the worker dies it is then handed out again, and
+    the original claim can no longer complete or fail it.
+    """
+
+    def enqueue(self, kind, payload=None, dedupe_key=None, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0.0):
+        """Add a job; returns its id, or None when it coalesced into a queued one"""
+        return self.enqueue_many([(kind, payload, dedupe_key)], max_attempts, delay)[0]
+
+    @abc.abstractmethod
+    def enqueue_many(self, jobs, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0.0):
+        pass
+
+    @abc.abstractmethod
+    def claim(self, worker, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT, kinds=None):
+        """Take the next runnable job, or None when there is nothing to do"""
+
+    @abc.abstractmethod
+    def complete(self, job):
+        """Mark a claimed job done; False when the claim was lost to another worker"""
+
+    @abc.abstractmethod
+    def fail(self, job, error, retry_delay=None):
+        """
+        Record a failed attempt; the job is retried until max_attempts is
+        reached. False when the claim was lost to another worker.
+        """
+
+    @abc.abstractmethod
+    def stats(self):
+        """{(kind, status): count}"""
+
+    @abc.abstractmethod
+    def purge(self, older_than_seconds=JOB_RETENTION_SECONDS):
+        """Delete finished jobs older than the cutoff; returns how many were removed"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Local job queue in its own SQLite file, separate from the application
+    database so enqueueing never contends with matching writes
+    """
+
+    def __init__(self, path="jobs.db"):
+        self.path = path
+        self.local = threading.local()
+        self._connect()
+        self.local.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                dedupe_key TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                locked_until REAL,
+                worker TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS jobs_queued_dedupe
+                ON jobs (dedupe_key) WHERE status = 'queued';
+            CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, available_at);
+        """)
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return _Transaction(conn)
+
+    def enqueue_many(self, jobs, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0.0):
+        now = time.time()
+        ids = []
+        with self._connect() as conn:
+            for kind, payload, dedupe_key in jobs:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (kind, payload, dedupe_key, status, max_attempts, available_at,"
+                    " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (dedupe_key) WHERE status = 'queued' DO NOTHING",
+                    (kind, json.dumps(payload or {}), dedupe_key, QUEUED, max_attempts, now + delay, now, now)
+                )
+                ids.append(cursor.lastrowid if cursor.rowcount else None)
+        return ids
+
+    def claim(self, worker, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT, kinds=None):
+        now = time.time()
+        kind_filter, params = "", [now, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        with self._connect() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT id, kind, payload, attempts, max_attempts FROM jobs"
+                    " WHERE ((status = 'queued' AND available_at <= ?)"
+                    " OR (status = 'running' AND locked_until < ?))" + kind_filter +
+                    " ORDER BY available_at, id LIMIT 1",
+                    params
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, kind, payload, attempts, max_attempts = row
+
+                # A job whose worker died on the last allowed attempt is given up on
+                if attempts >= max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, last_error = COALESCE(last_error, ?), updated_at = ?"
+                        " WHERE id = ?",
+                        (FAILED, "visibility timeout expired", now, job_id)
+                    )
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, locked_until = ?, worker = ?,"
+                    " updated_at = ? WHERE id = ?",
+                    (RUNNING, now + visibility_timeout, worker, now, job_id)
+                )
+                return Job(job_id, kind, json.loads(payload), attempts + 1, max_attempts, worker)
+
+    # Matches a job only while this claim still owns it
+    OWNED = "id = ? AND status = 'running' AND worker = ? AND attempts = ?"
+
+    def complete(self, job):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, locked_until = NULL, updated_at = ? WHERE " + self.OWNED,
+                (DONE, time.time(), job.id, job.worker, job.attempts)
+            )
+            return cursor.rowcount > 0
+
+    def fail(self, job, error, retry_delay=None):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts, dedupe_key FROM jobs WHERE " + self.OWNED,
+                (job.id, job.worker, job.attempts)
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts, dedupe_key = row
+            if retry_delay is None:
+                retry_delay = RETRY_BASE_DELAY * 2 ** (attempts - 1)
+
+            # Retry unless out of attempts or an equivalent job is already queued
+            duplicate = dedupe_key is not None and conn.execute(
+                "SELECT 1 FROM jobs WHERE dedupe_key = ? AND status = 'queued'", (dedupe_key,)
+            ).fetchone()
+            status = FAILED if attempts >= max_attempts or duplicate else QUEUED
+            if duplicate:
+                error = f"superseded by a queued job: {error}"
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, locked_until = NULL, last_error = ?,"
+                " updated_at = ? WHERE id = ?",
+                (status, now + retry_delay, str(error)[:2000], now, job.id)
+            )
+            return True
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        return {(kind, status): count for kind, status, count in rows}
+
+    def purge(self, older_than_seconds=JOB_RETENTION_SECONDS):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - older_than_seconds)
+            )
+            return cursor.rowcount
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT around a block, so claims never race"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def sqlite_queue(url):
+    # Same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+    path = url.path[1:] if url.path.startswith("//") else url.path.lstrip("/")
+    return SQLiteJobQueue(path or "jobs.db")
+
+
+# Backends by URL scheme; other brokers can be plugged in with register_backend
+BACKENDS = {
+    "sqlite": sqlite_queue,
+}
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def register_backend(scheme, factory):
+    """factory(parsed_url) -> JobQueue"""
+    BACKENDS[scheme] = factory
+
+
+def get_queue(url=None):
+    url = url or JOB_QUEUE_URL
+    with _queues_lock:
+        queue = _queues.get(url)
+        if queue is None:
+            parsed = urlparse(url)
+            if parsed.scheme not in BACKENDS:
+                raise ValueError(f"Unknown job queue backend: {parsed.scheme}")
+            queue = _queues[url] = BACKENDS[parsed.scheme](parsed)
+    return queue
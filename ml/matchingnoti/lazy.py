@@ -0,0 +1,44 @@
+# lazy.py
+import importlib
+import threading
+
+_lock = threading.Lock()
+_optional = {}
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, so
+    heavy dependencies only load when a code path actually needs them
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def optional_import(name):
+    """Import an optional dependency on first call; None when it is not installed"""
+    with _lock:
+        if name not in _optional:
+            try:
+                _optional[name] = importlib.import_module(name)
+            except ImportError:
+                _optional[name] = None
+        return _optional[name]
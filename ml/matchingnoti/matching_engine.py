@@ -1,17 +1,47 @@
 # matching_engine.py
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import Organization, Donation, Claim, Notification, FoodCategoryPreference
-from sklearn.preprocessing import MinMaxScaler
-from geopy.distance import geodesic
+from sqlalchemy import func, case
+from models import Organization, Donation, DonationAllergen, Claim, Notification, FoodCategoryPreference, \
+    OrganizationCategoryAcceptance
+from acceptance import ACCEPTED_STATUSES
+from scoring import DEFAULT_SCORING, SUB_SCORES, evaluate_variants, rank
+from assignment import solve_assignment
+from snapshot import get_organization_snapshot, mark_organizations_changed, haversine_km, NO_PREFERENCE
+from response_cache import cache as response_cache, organization_tag
+from metrics import stage_timer
+import notification_counters
+from profiling import profile_methods
+from lazy import lazy_import
 
+# Heavy dependencies only needed by a few code paths load on first use
+geopy_distance = lazy_import("geopy.distance")
+sklearn_pairwise = lazy_import("sklearn.metrics.pairwise")
+
+# Upper bound on donation/organization pairs scored at once by assign_donations
+PAIR_BLOCK = 1_000_000
+
+# Column positions in the sub-score matrix
+CATEGORY, DISTANCE, STORAGE, ALLERGEN, HISTORICAL, CAPACITY = (
+    SUB_SCORES.index(name)
+    for name in ("category", "distance", "storage", "allergen", "historical", "capacity")
+)
+
+@profile_methods(
+    "find_matches_for_donation",
+    "find_matches_for_organization",
+    "compare_scoring_variants",
+    "create_notifications_for_donation",
+    "assign_donations",
+    "update_matching_model",
+)
 class MatchingEngine:
-    def __init__(self, db_session):
+    def __init__(self, db_session, scoring=DEFAULT_SCORING):
         self.db = db_session
-        self.scaler = MinMaxScaler()
+        self.scoring = scoring
+        self.category_acceptance = {}  # (organization_id, category) -> decayed acceptance rate
+        self.loaded_acceptance_categories = set()
     
     def get_geocoordinates(self, address, city, state, zip_code):
         """
@@ -92,7 +122,7 @@ class MatchingEngine:
         )
         
         # Calculate distance in kilometers
-        distance = geodesic(donor_coords, recipient_coords).kilometers
+        distance = geopy_distance.geodesic(donor_coords, recipient_coords).kilometers
         
         # Check if within max pickup distance
         if distance > recipient_org.max_pickup_distance_km:
@@ -137,18 +167,48 @@ class MatchingEngine:
         
         return 1.0  # No allergen conflicts
     
-    def calculate_historical_acceptance_score(self, organization):
+    def load_category_acceptance(self, category):
+        """
+        Load the decayed acceptance rate of every organization for one category
+        in a single query, so later lookups are dictionary reads
+        """
+        if category in self.loaded_acceptance_categories:
+            return
+        rows = self.db.query(
+            OrganizationCategoryAcceptance.organization_id,
+            OrganizationCategoryAcceptance.acceptance_rate
+        ).filter(OrganizationCategoryAcceptance.category == category).all()
+        for organization_id, rate in rows:
+            self.category_acceptance[(organization_id, category)] = rate
+        self.loaded_acceptance_categories.add(category)
+    
+    def calculate_historical_acceptance_score(self, organization, category=None):
         """
         Calculate a score based on organization's history of accepting similar donations
         """
-        # A real implementation would use ML to analyze past acceptance patterns
-        # For this demo, we'll use the organization's acceptance rate
-        
+        # Prefer the time-decayed rate for this food category when we have one
+        if category is not None:
+            self.load_category_acceptance(category)
+            rate = self.category_acceptance.get((organization.id, category))
+            if rate is not None:
+                return min(1.0, rate)
+        
+        # Fall back to the organization's overall acceptance rate
         if organization.acceptance_rate is None:
             return 0.5  # Neutral score for new organizations
         
         return min(1.0, organization.acceptance_rate)
     
+    def estimate_weight_kg(self, donation):
+        """
+        Rough donation weight in kg; non-kg units are assumed to be 0.5 kg each
+        """
+        return donation.quantity if donation.unit == 'kg' else donation.quantity * 0.5
+    
+    def donor_name(self, snapshot, donation):
+        row = snapshot.index.get(donation.donor_organization_id)
+        return snapshot.names[row] if row is not None else None
+    
     def calculate_capacity_score(self, donation, organization):
         """
         Determine if the organization has capacity for this donation
@@ -160,7 +220,7 @@ class MatchingEngine:
             return 0.5  # Unknown capacity
         
         # Estimate donation weight in kg
-        estimated_weight = donation.quantity if donation.unit == 'kg' else donation.quantity * 0.5
+        estimated_weight = self.estimate_weight_kg(donation)
         
         # Calculate percent of organization's capacity this would use
         capacity_percentage = min(1.0, estimated_weight / organization.storage_capacity_kg)
@@ -168,156 +228,227 @@ class MatchingEngine:
         # Higher score for lower percentage (more available capacity)
         return 1.0 - capacity_percentage
     
+    def organization_snapshot(self):
+        """
+        The worker-wide organization snapshot, with pending changes applied
+        """
+        return get_organization_snapshot(self.db, self.get_geocoordinates)
+    
+    def category_acceptance_column(self, snapshot, category):
+        """
+        Decayed acceptance rate for one category aligned to snapshot rows, NaN where unknown
+        """
+        self.load_category_acceptance(category)
+        column = np.full(len(snapshot), np.nan)
+        for (organization_id, cat), rate in self.category_acceptance.items():
+            row = snapshot.index.get(organization_id) if cat == category else None
+            if row is not None and rate is not None:
+                column[row] = rate
+        return column
+    
+    def donation_features(self, snapshot, donations):
+        """
+        Per-donation inputs of the scoring kernel as arrays, with allergens
+        for every donation loaded in one query
+        """
+        ids = [donation.id for donation in donations]
+        allergen_masks = dict.fromkeys(ids, 0)
+        if ids:
+            for donation_id, allergen in self.db.query(
+                DonationAllergen.donation_id, DonationAllergen.allergen
+            ).filter(DonationAllergen.donation_id.in_(ids)):
+                allergen_masks[donation_id] |= snapshot.allergen_bit(allergen)
+        
+        donor_rows = [snapshot.row(donation.donor_organization_id) for donation in donations]
+        return {
+            'perishability': np.array([self.calculate_perishability_score(d) for d in donations], dtype=np.float64),
+            'category': [donation.category for donation in donations],
+            'category_column': np.array([snapshot.category_column(d.category) for d in donations], dtype=np.int64),
+            'storage': np.array([
+                d.storage_requirements.lower() if d.storage_requirements else "room_temperature"
+                for d in donations
+            ]),
+            'weight': np.array([self.estimate_weight_kg(d) for d in donations], dtype=np.float64),
+            'allergen_mask': np.array([allergen_masks[d.id] for d in donations], dtype=np.int64),
+            'donor_latitude': np.array([snapshot.latitude[r] if r is not None else np.nan for r in donor_rows]),
+            'donor_longitude': np.array([snapshot.longitude[r] if r is not None else np.nan for r in donor_rows]),
+        }
+    
+    def score_pairs(self, snapshot, features, donation_index, rows):
+        """
+        Sub-score matrix, in SUB_SCORES order, for donation/organization pairs
+        given as parallel arrays of donation positions and snapshot rows.
+        Mirrors the calculate_*_score methods, vectorized over the pairs.
+        """
+        donation_index = np.asarray(donation_index, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = np.empty((len(rows), len(SUB_SCORES)), dtype=np.float64)
+        scores[:, SUB_SCORES.index("perishability")] = features['perishability'][donation_index]
+        
+        # As calculate_category_match_score: a stated level scores level / 10,
+        # so level 0 is filtered out; no row scores 0.1, or 0.5 without any rows
+        level = snapshot.preferences[rows, features['category_column'][donation_index]]
+        scores[:, CATEGORY] = np.where(
+            level != NO_PREFERENCE, level / 10.0, np.where(snapshot.has_preferences[rows], 0.1, 0.5)
+        )
+        
+        max_distance = snapshot.max_distance_km[rows]
+        distance = haversine_km(
+            features['donor_latitude'][donation_index], features['donor_longitude'][donation_index],
+            snapshot.latitude[rows], snapshot.longitude[rows]
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores[:, DISTANCE] = np.where(distance <= max_distance, 1.0 - distance / max_distance, 0.0)
+        
+        storage = features['storage'][donation_index]
+        storage_score = np.ones(len(rows))
+        storage_score[(storage == "dry") & ~snapshot.has_dry_storage[rows]] = 0.3
+        storage_score[(storage == "refrigerated") & ~snapshot.has_refrigeration[rows]] = 0.0
+        storage_score[(storage == "frozen") & ~snapshot.has_freezer[rows]] = 0.0
+        scores[:, STORAGE] = storage_score
+        
+        conflicts = features['allergen_mask'][donation_index] & snapshot.allergen_mask[rows]
+        scores[:, ALLERGEN] = np.where(conflicts != 0, 0.0, 1.0)
+        
+        historical = snapshot.acceptance_rate[rows]
+        categories = np.array(features['category'], dtype=object)[donation_index]
+        for category in set(features['category']):
+            pair_mask = categories == category
+            category_rate = self.category_acceptance_column(snapshot, category)[rows[pair_mask]]
+            historical[pair_mask] = np.where(np.isnan(category_rate), historical[pair_mask], category_rate)
+        scores[:, HISTORICAL] = np.where(np.isnan(historical), 0.5, np.minimum(1.0, historical))
+        
+        capacity = snapshot.capacity_kg[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            used = np.minimum(1.0, features['weight'][donation_index] / capacity)
+        scores[:, CAPACITY] = np.where(np.isnan(capacity), 0.5, 1.0 - used)
+        return scores
+    
+    def score_candidates_for_donation(self, donation_id, method="find_matches_for_donation"):
+        """
+        Build the sub-score matrix of a donation against every potential recipient.
+        Returns the donation, the recipients' snapshot rows and the matrix.
+        """
+        with stage_timer(method, "preload"):
+            # Get the donation
+            donation = self.db.query(Donation).filter_by(id=donation_id).first()
+            if not donation:
+                return None, np.empty(0, dtype=np.int64), np.empty((0, len(SUB_SCORES)))
+            
+            # Potential recipients: every active non-donor organization except the donor
+            snapshot = self.organization_snapshot()
+            rows = np.flatnonzero(
+                snapshot.active & ~snapshot.is_donor & (snapshot.ids != donation.donor_organization_id)
+            )
+            features = self.donation_features(snapshot, [donation])
+        
+        with stage_timer(method, "score"):
+            scores = self.score_pairs(snapshot, features, np.zeros(len(rows), dtype=np.int64), rows)
+        return donation, rows, scores
+    
     def find_matches_for_donation(self, donation_id, limit=10):
         """
         Find the best recipient matches for a given donation
         """
-        # Get the donation
-        donation = self.db.query(Donation).filter_by(id=donation_id).first()
-        if not donation:
+        donation, recipients, scores = self.score_candidates_for_donation(donation_id)
+        if donation is None:
             return []
-            
-        # Get the donor organization
-        donor_org = donation.donor_organization
+        snapshot = self.organization_snapshot()
         
-        # Get all potential recipient organizations
-        potential_recipients = self.db.query(Organization).filter(
-            Organization.id != donor_org.id,  # Exclude the donor
-            Organization.org_type != 'donor'  # Only include recipient organizations
-        ).all()
+        # Weighted score and hard filters from the shared scoring kernel
+        with stage_timer("find_matches_for_donation", "filter"):
+            overall, passes = self.scoring.score(scores)
+        
+        with stage_timer("find_matches_for_donation", "sort"):
+            top = rank(overall, passes, limit)
         
-        # Calculate match scores
         matches = []
-        for org in potential_recipients:
-            # Skip if organization restricts this food category entirely
-            category_score = self.calculate_category_match_score(donation, org)
-            if category_score == 0:
-                continue
-            
-            # Skip if storage is incompatible
-            storage_score = self.calculate_storage_compatibility_score(donation, org)
-            if storage_score == 0:
-                continue
-            
-            # Skip if allergens are incompatible
-            allergen_score = self.calculate_allergen_compatibility_score(donation, org)
-            if allergen_score == 0:
-                continue
-            
-            # Calculate distance score
-            distance_score = self.calculate_distance_score(donor_org, org)
-            if distance_score == 0:
-                continue  # Too far away
-            
-            # Calculate other scores
-            perishability_score = self.calculate_perishability_score(donation)
-            historical_score = self.calculate_historical_acceptance_score(org)
-            capacity_score = self.calculate_capacity_score(donation, org)
-            
-            # Calculate overall match score (weighted average)
-            overall_score = (
-                perishability_score * 0.15 +
-                category_score * 0.20 +
-                distance_score * 0.25 +
-                storage_score * 0.10 +
-                allergen_score * 0.05 +
-                historical_score * 0.15 +
-                capacity_score * 0.10
-            )
-            
+        for i in top:
+            row = recipients[i]
             matches.append({
-                'organization_id': org.id,
-                'organization_name': org.name,
-                'match_score': overall_score,
-                'distance_score': distance_score,
-                'category_score': category_score,
-                'storage_score': storage_score,
-                'allergen_score': allergen_score,
-                'historical_score': historical_score,
-                'capacity_score': capacity_score
+                'organization_id': int(snapshot.ids[row]),
+                'organization_name': snapshot.names[row],
+                'match_score': float(overall[i]),
+                'distance_score': scores[i, DISTANCE],
+                'category_score': scores[i, CATEGORY],
+                'storage_score': scores[i, STORAGE],
+                'allergen_score': scores[i, ALLERGEN],
+                'historical_score': scores[i, HISTORICAL],
+                'capacity_score': scores[i, CAPACITY]
             })
         
-        # Sort by match score (descending)
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
-        
-        # Return top matches
-        return matches[:limit]
+        return matches
+    
+    def compare_scoring_variants(self, donation_id, configs, limit=10):
+        """
+        Rank the same recipient candidates under several scoring configurations
+        in one pass, e.g. for A/B testing weight changes
+        """
+        donation, recipients, scores = self.score_candidates_for_donation(
+            donation_id, "compare_scoring_variants"
+        )
+        if donation is None:
+            return {}
+        ids = self.organization_snapshot().ids
+        
+        results = {}
+        for name, (overall, passes) in evaluate_variants(scores, configs).items():
+            results[name] = [
+                {'organization_id': int(ids[recipients[i]]), 'match_score': float(overall[i])}
+                for i in rank(overall, passes, limit)
+            ]
+        return results
     
     def find_matches_for_organization(self, organization_id, limit=10):
         """
         Find the best donation matches for a given organization
         """
-        # Get the organization
-        organization = self.db.query(Organization).filter_by(id=organization_id).first()
-        if not organization:
-            return []
+        with stage_timer("find_matches_for_organization", "preload"):
+            # Get the organization's snapshot row
+            snapshot = self.organization_snapshot()
+            row = snapshot.row(organization_id)
+            if row is None:
+                return []
+            
+            # Get all available donations, excluding this organization's own
+            available_donations = self.db.query(Donation).filter_by(
+                status='available'
+            ).filter(
+                Donation.available_until > datetime.utcnow(),
+                Donation.donor_organization_id != organization_id
+            ).all()
+        
+            features = self.donation_features(snapshot, available_donations)
+        
+        with stage_timer("find_matches_for_organization", "score"):
+            scores = self.score_pairs(
+                snapshot, features,
+                np.arange(len(available_donations)), np.full(len(available_donations), row)
+            )
         
-        # Get all available donations
-        available_donations = self.db.query(Donation).filter_by(
-            status='available'
-        ).filter(
-            Donation.available_until > datetime.utcnow()
-        ).all()
+        # Weighted score and hard filters from the shared scoring kernel
+        with stage_timer("find_matches_for_organization", "filter"):
+            overall, passes = self.scoring.score(scores)
+        
+        with stage_timer("find_matches_for_organization", "sort"):
+            top = rank(overall, passes, limit)
         
-        # Calculate match scores
         matches = []
-        for donation in available_donations:
-            # Skip if donation comes from this organization
-            if donation.donor_organization_id == organization_id:
-                continue
-                
-            # Get donor organization
-            donor_org = donation.donor_organization
-            
-            # Skip if storage is incompatible
-            storage_score = self.calculate_storage_compatibility_score(donation, organization)
-            if storage_score == 0:
-                continue
-            
-            # Skip if allergens are incompatible
-            allergen_score = self.calculate_allergen_compatibility_score(donation, organization)
-            if allergen_score == 0:
-                continue
-            
-            # Calculate distance score
-            distance_score = self.calculate_distance_score(donor_org, organization)
-            if distance_score == 0:
-                continue  # Too far away
-            
-            # Calculate other scores
-            category_score = self.calculate_category_match_score(donation, organization)
-            perishability_score = self.calculate_perishability_score(donation)
-            historical_score = self.calculate_historical_acceptance_score(organization)
-            capacity_score = self.calculate_capacity_score(donation, organization)
-            
-            # Calculate overall match score (weighted average)
-            overall_score = (
-                perishability_score * 0.15 +
-                category_score * 0.20 +
-                distance_score * 0.25 +
-                storage_score * 0.10 +
-                allergen_score * 0.05 +
-                historical_score * 0.15 +
-                capacity_score * 0.10
-            )
-            
+        for i in top:
+            donation = available_donations[i]
             matches.append({
                 'donation_id': donation.id,
                 'donation_title': donation.title,
                 'donation_category': donation.category,
-                'match_score': overall_score,
-                'distance_score': distance_score,
-                'category_score': category_score,
-                'storage_score': storage_score,
+                'match_score': float(overall[i]),
+                'distance_score': scores[i, DISTANCE],
+                'category_score': scores[i, CATEGORY],
+                'storage_score': scores[i, STORAGE],
                 'expiration_date': donation.expiration_date,
-                'donor_organization': donor_org.name
+                'donor_organization': self.donor_name(snapshot, donation)
             })
         
-        # Sort by match score (descending)
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
-        
-        # Return top matches
-        return matches[:limit]
+        return matches
     
     def create_notifications_for_donation(self, donation_id, match_threshold=0.6):
         """
@@ -350,51 +481,178 @@ class MatchingEngine:
         
         return notifications
     
-    def update_matching_model(self):
+    def score_donation_blocks(self, snapshot, features, donations):
         """
-        Update the matching model based on recent acceptance/rejection patterns
-        In a real system, this would use more sophisticated ML techniques
+        Score donations against every recipient in blocks of at most PAIR_BLOCK
+        pairs. Yields (donation_index, rows, overall, passes) per block, laid
+        out donation-major; a donation's own donor never passes.
         """
-        # Get recent claims (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_claims = self.db.query(Claim).filter(
-            Claim.claimed_at >= thirty_days_ago
-        ).all()
+        recipients = np.flatnonzero(snapshot.active & ~snapshot.is_donor)
+        if len(recipients) == 0:
+            return
+        donor_ids = np.array([donation.donor_organization_id or -1 for donation in donations], dtype=np.int64)
+        block = max(1, PAIR_BLOCK // len(recipients))
+        
+        for first in range(0, len(donations), block):
+            donation_index = np.repeat(np.arange(first, min(first + block, len(donations))), len(recipients))
+            rows = np.tile(recipients, len(donation_index) // len(recipients))
+            overall, passes = self.scoring.score(self.score_pairs(snapshot, features, donation_index, rows))
+            passes = passes & (snapshot.ids[rows] != donor_ids[donation_index])
+            yield donation_index, rows, overall, passes
+    
+    def create_notifications_for_donations(self, donation_ids, match_threshold=0.6, limit=10):
+        """
+        Batched create_notifications_for_donation: one scoring pass over all
+        the donations and one bulk insert of their notifications
+        """
+        donations = self.db.query(Donation).filter(Donation.id.in_(donation_ids)).all()
+        snapshot = self.organization_snapshot()
+        features = self.donation_features(snapshot, donations)
         
-        # Update organization acceptance rates
-        org_claims = {}
-        org_accepts = {}
+        notifications = []
+        now = datetime.utcnow()
+        for donation_index, rows, overall, passes in self.score_donation_blocks(snapshot, features, donations):
+            # Each donation's candidates are one contiguous run of the block
+            n_recipients = np.count_nonzero(donation_index == donation_index[0])
+            for d, donation_scores, donation_passes, donation_rows in zip(
+                donation_index[::n_recipients],
+                overall.reshape(-1, n_recipients),
+                passes.reshape(-1, n_recipients),
+                rows.reshape(-1, n_recipients)
+            ):
+                donation = donations[d]
+                for i in rank(donation_scores, donation_passes & (donation_scores >= match_threshold), limit):
+                    notifications.append({
+                        'organization_id': int(snapshot.ids[donation_rows[i]]),
+                        'donation_id': donation.id,
+                        'message': f"New food donation available: {donation.title} ({donation.quantity} {donation.unit})",
+                        'notification_type': "match",
+                        'relevance_score': float(donation_scores[i]),
+                        'created_at': now,
+                        'is_read': False
+                    })
+        
+        self.db.bulk_insert_mappings(Notification, notifications)
+        notification_counters.record_inserted(self.db, notifications)
+        self.db.commit()
         
-        for claim in recent_claims:
-            org_id = claim.recipient_organization_id
-            
-            if org_id not in org_claims:
-                org_claims[org_id] = 0
-                org_accepts[org_id] = 0
-            
-            org_claims[org_id] += 1
-            
-            if claim.status in ['accepted', 'completed']:
-                org_accepts[org_id] += 1
+        return notifications
+    
+    def match_existing_donations(self, organization_id, match_threshold=0.6):
+        """
+        Notify a (new) organization of the available donations that match it well
+        """
+        matches = [
+            match for match in self.find_matches_for_organization(organization_id)
+            if match['match_score'] >= match_threshold
+        ]
+        notifications = [Notification(
+            organization_id=organization_id,
+            donation_id=match['donation_id'],
+            message=f"Food donation available: {match['donation_title']}",
+            notification_type="match",
+            relevance_score=match['match_score']
+        ) for match in matches]
+        
+        self.db.add_all(notifications)
+        self.db.commit()
         
-        # Update organizations
-        for org_id, claim_count in org_claims.items():
-            if claim_count > 0:
-                acceptance_rate = org_accepts[org_id] / claim_count
-                
-                org = self.db.query(Organization).filter_by(id=org_id).first()
-                if org:
-                    org.acceptance_rate = acceptance_rate
+        return notifications
+    
+    def assign_donations(self, donation_ids=None, match_threshold=0.6, top_k=50, method="lp"):
+        """
+        Globally assign available donations to recipients in one batch.
+        Instead of notifying every good match per donation, solve a
+        capacity-constrained assignment over the donation x organization
+        score matrix so no organization is handed more than its
+        storage_capacity_kg, then write one notification per assigned donation.
+        """
+        query = self.db.query(Donation).filter(Donation.status == 'available')
+        if donation_ids is not None:
+            query = query.filter(Donation.id.in_(donation_ids))
+        donations = query.all()
+        
+        snapshot = self.organization_snapshot()
+        features = self.donation_features(snapshot, donations)
+        
+        # Sparse edge list over feasible pairs only
+        edge_donations, edge_rows, edge_scores = [], [], []
+        for donation_index, rows, overall, passes in self.score_donation_blocks(snapshot, features, donations):
+            feasible = np.flatnonzero(passes & (overall >= match_threshold))
+            edge_donations.append(donation_index[feasible])
+            edge_rows.append(rows[feasible])
+            edge_scores.append(overall[feasible])
+        
+        edge_donations = np.concatenate(edge_donations) if edge_donations else np.empty(0, dtype=np.int64)
+        edge_scores = np.concatenate(edge_scores) if edge_scores else np.empty(0)
+        organizations, edge_orgs = np.unique(
+            np.concatenate(edge_rows) if edge_rows else np.empty(0, dtype=np.int64), return_inverse=True
+        )
+        
+        weights = features['weight']
+        capacities = np.nan_to_num(snapshot.capacity_kg[organizations], nan=np.inf)
+        
+        assigned = solve_assignment(edge_donations, edge_orgs, edge_scores, weights, capacities,
+                                    top_k=top_k, method=method)
+        
+        # Look up each assigned edge's score for the notification relevance
+        edge_score = {(d, o): s for d, o, s in zip(edge_donations, edge_orgs, edge_scores)}
+        notifications = []
+        for d, o in enumerate(assigned):
+            if o < 0:
+                continue
+            donation = donations[d]
+            notifications.append({
+                'organization_id': int(snapshot.ids[organizations[o]]),
+                'donation_id': donation.id,
+                'message': f"New food donation available: {donation.title} ({donation.quantity} {donation.unit})",
+                'notification_type': "match",
+                'relevance_score': float(edge_score[(d, o)]),
+                'created_at': datetime.utcnow(),
+                'is_read': False
+            })
         
+        self.db.bulk_insert_mappings(Notification, notifications)
+        notification_counters.record_inserted(self.db, notifications)
         self.db.commit()
         
         return {
-            "organizations_updated": len(org_claims),
-            "total_claims_analyzed": len(recent_claims)
+            "donations_considered": len(donations),
+            "donations_assigned": len(notifications),
+            "organizations_used": len({n['organization_id'] for n in notifications})
+        }
+    
+    def update_matching_model(self):
+        """
+        Update the matching model based on recent acceptance/rejection patterns
+        In a real system, this would use more sophisticated ML techniques
+        """
+        # Aggregate recent claims (last 30 days) per organization in the database
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        accepted = case((Claim.status.in_(sorted(ACCEPTED_STATUSES)), 1), else_=0)
+        org_counts = self.db.query(
+            Claim.recipient_organization_id,
+            func.count(Claim.id),
+            func.sum(accepted)
+        ).filter(
+            Claim.claimed_at >= thirty_days_ago,
+            Claim.recipient_organization_id.isnot(None)
+        ).group_by(Claim.recipient_organization_id).all()
+        
+        # Write every organization's rate in one bulk UPDATE
+        self.db.bulk_update_mappings(Organization, [
+            {"id": org_id, "acceptance_rate": accepts / claim_count}
+            for org_id, claim_count, accepts in org_counts
+        ])
+        self.db.commit()
+        # Bulk updates bypass the flush events, so report the changes explicitly
+        mark_organizations_changed(self.db, [org_id for org_id, _, _ in org_counts])
+        response_cache.invalidate([organization_tag(org_id) for org_id, _, _ in org_counts])
+        
+        return {
+            "organizations_updated": len(org_counts),
+            "total_claims_analyzed": sum(claim_count for _, claim_count, _ in org_counts)
         }
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-
 class NotificationEngine:
     def __init__(self, db_session):
         self.db = db_session
@@ -409,7 +667,7 @@ class NotificationEngine:
         # 1. Content-based filtering
         donation_embedding = self.food_embeddings[donation.category]
         user_profile = self.get_user_embedding(user)
-        content_score = cosine_similarity([user_profile], [donation_embedding])[0][0]
+        content_score = sklearn_pairwise.cosine_similarity([user_profile], [donation_embedding])[0][0]
         
         # 2. Collaborative filtering factors
         past_acceptance_rate = self.calculate_acceptance_rate(user)
@@ -0,0 +1,186 @@
+# metrics.py
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Fraction of requests that are instrumented; 0 turns instrumentation off
+SAMPLE_RATE = float(os.getenv("FOODBRIDGE_METRICS_SAMPLE_RATE", "1.0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Per-request SQL statistics; None when the current request is not sampled
+_request_stats = ContextVar("foodbridge_request_stats", default=None)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *labels, amount=1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = float(value)
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "foodbridge_request_duration_seconds", "HTTP request latency", ("method", "endpoint", "status"))
+REQUEST_SQL_STATEMENTS = Histogram(
+    "foodbridge_request_sql_statements", "SQL statements executed per request", ("endpoint",), COUNT_BUCKETS)
+REQUEST_SQL_DURATION = Histogram(
+    "foodbridge_request_sql_duration_seconds", "Total SQL time per request", ("endpoint",))
+SQL_STATEMENT_DURATION = Histogram(
+    "foodbridge_sql_statement_duration_seconds", "Duration of individual SQL statements", ("operation",))
+MATCHING_STAGE_DURATION = Histogram(
+    "foodbridge_matching_stage_duration_seconds", "Time spent in MatchingEngine stages", ("method", "stage"))
+JOB_QUEUE_JOBS = Gauge(
+    "foodbridge_jobs", "Jobs in the durable job queue by kind and status", ("kind", "status"))
+
+REGISTRY = [
+    REQUEST_LATENCY,
+    REQUEST_SQL_STATEMENTS,
+    REQUEST_SQL_DURATION,
+    SQL_STATEMENT_DURATION,
+    MATCHING_STAGE_DURATION,
+    JOB_QUEUE_JOBS,
+]
+
+
+def render_metrics():
+    """Prometheus text exposition of every registered metric"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def should_sample():
+    return SAMPLE_RATE > 0 and (SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE)
+
+
+@contextmanager
+def track_request():
+    """
+    Collect SQL statistics for the duration of one sampled request.
+    Yields the stats dict, or None when the request is not sampled.
+    """
+    if not should_sample():
+        yield None
+        return
+    stats = {"statements": 0, "sql_seconds": 0.0}
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def observe_request(method, endpoint, status_code, seconds, stats):
+    REQUEST_LATENCY.observe(seconds, method, endpoint, status_code)
+    REQUEST_SQL_STATEMENTS.observe(stats["statements"], endpoint)
+    REQUEST_SQL_DURATION.observe(stats["sql_seconds"], endpoint)
+
+
+@contextmanager
+def stage_timer(method, stage):
+    """Time a MatchingEngine stage; a no-op outside sampled requests"""
+    if _request_stats.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        MATCHING_STAGE_DURATION.observe(time.perf_counter() - started, method, stage)
+
+
+def instrument_engine(engine):
+    """Hook SQLAlchemy cursor events to time statements of sampled requests"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _request_stats.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        if stats is None or not conn.info.get("query_started"):
+            return
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats["statements"] += 1
+        stats["sql_seconds"] += elapsed
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        SQL_STATEMENT_DURATION.observe(elapsed, operation)
+
+
+def observe_job_queue(queue):
+    """Refresh the job queue gauge from the queue's counts"""
+    for (kind, status), count in queue.stats().items():
+        JOB_QUEUE_JOBS.set(count, kind, status)
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Table, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Table, Text, Enum, DDL, event
 from sqlalchemy.orm import declarative_base, relationship  # Updated import
 from datetime import datetime
 import enum
@@ -133,6 +133,18 @@ class FoodCategoryPreference(Base):
     # Relationship
     organization = relationship("Organization", back_populates="accepted_food_categories")
 
+class OrganizationCategoryAcceptance(Base):
+    __tablename__ = 'organization_category_acceptance'
+    
+    organization_id = Column(Integer, ForeignKey('organizations.id'), primary_key=True)
+    category = Column(String, primary_key=True)
+    
+    # Time-decayed counters, maintained incrementally as claims change status
+    decayed_claims = Column(Float, default=0.0)
+    decayed_accepts = Column(Float, default=0.0)
+    acceptance_rate = Column(Float)
+    updated_at = Column(DateTime)
+
 class DietaryRestriction(Base):
     __tablename__ = 'dietary_restrictions'
     
@@ -186,6 +198,7 @@ class Donation(Base):
     # AI-related fields
     priority_score = Column(Float, default=0.0)  # Calculated based on perishability, time left, etc.
     matching_score = Column(Float, default=0.0)  # Updated by the AI
+    predicted_demand = Column(Float)  # Next-period claims from the demand forecast job
 
 class DonationAllergen(Base):
     __tablename__ = 'donation_allergen_items'
@@ -238,6 +251,14 @@ class Notification(Base):
     from datetime import datetime
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON
 
+class NotificationCounter(Base):
+    __tablename__ = 'notification_counters'
+    
+    # Unread notifications per organization, kept in step with the
+    # notifications table by notification_counters.py
+    organization_id = Column(Integer, ForeignKey('organizations.id'), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
 class UserPreferences(Base):
     __tablename__ = 'user_preferences'
     
@@ -249,3 +270,96 @@ class UserPreferences(Base):
     disliked_items = Column(JSON)
     notification_preferences = Column(JSON)  # {"email": True, "push": False, ...}
     last_active = Column(DateTime)
+
+# --------------------------
+# Archive (cold) tables, filled by archive.py
+# --------------------------
+
+def archive_table(table):
+    """
+    Cold copy of a hot table: the same columns without keys to other
+    tables, so rows can be moved in batches in any order, plus when each
+    row was archived
+    """
+    return Table(
+        f"{table.name}_archive",
+        Base.metadata,
+        *[Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False) for c in table.columns],
+        Column("archived_at", DateTime, nullable=False, index=True),
+    )
+
+def history_view(table, archive):
+    """
+    <table>_history: hot and archived rows together, for analytics reads.
+    Created after every create_all, once both tables exist.
+    """
+    columns = ", ".join(c.name for c in table.columns)
+    select = (f"SELECT {columns}, CAST(NULL AS TIMESTAMP) AS archived_at FROM {table.name}"
+              f" UNION ALL SELECT {columns}, archived_at FROM {archive.name}")
+    name = f"{table.name}_history"
+    event.listen(Base.metadata, "after_create",
+                 DDL(f"CREATE VIEW IF NOT EXISTS {name} AS {select}").execute_if(dialect="sqlite"))
+    event.listen(Base.metadata, "after_create",
+                 DDL(f"CREATE OR REPLACE VIEW {name} AS {select}").execute_if(dialect="postgresql"))
+    event.listen(Base.metadata, "before_drop", DDL(f"DROP VIEW IF EXISTS {name}"))
+    return name
+
+# Hot table -> archive table, in the order archive.py moves them
+ARCHIVE_TABLES = {}
+for _hot in (Notification.__table__, Claim.__table__, Donation.__table__, DonationAllergen.__table__):
+    ARCHIVE_TABLES[_hot.name] = archive_table(_hot)
+    history_view(_hot, ARCHIVE_TABLES[_hot.name])
+
+# --------------------------
+# Full-text search over donations, queried by search.py
+# --------------------------
+
+# Full-text index over these donation columns, weighted in this order for
+# ranking. SQLite keeps an FTS5 table in step with triggers; PostgreSQL a
+# generated tsvector column with a GIN index.
+SEARCH_COLUMNS = ("title", "subcategory", "description")
+SEARCH_TABLE = "donations_fts"
+SEARCH_VECTOR = "search_vector"
+
+@event.listens_for(Base.metadata, "after_create")
+def create_donation_search_index(target, connection, **kw):
+    columns = ", ".join(SEARCH_COLUMNS)
+    if connection.dialect.name == "sqlite":
+        if connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)
+        ).first():
+            return
+        new = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+        old = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+        insert_new = f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new});"
+        delete_old = (f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns})"
+                      f" VALUES ('delete', old.id, {old});")
+        for statement in (
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({columns}, content='donations',"
+            f" content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER {SEARCH_TABLE}_insert AFTER INSERT ON donations BEGIN {insert_new} END",
+            f"CREATE TRIGGER {SEARCH_TABLE}_delete AFTER DELETE ON donations BEGIN {delete_old} END",
+            f"CREATE TRIGGER {SEARCH_TABLE}_update AFTER UPDATE OF {columns} ON donations"
+            f" BEGIN {delete_old} {insert_new} END",
+            # Index donations that existed before the index did
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+        ):
+            connection.exec_driver_sql(statement)
+    elif connection.dialect.name == "postgresql":
+        vector = " || ".join(
+            f"setweight(to_tsvector('english', coalesce({c}, '')), '{weight}')"
+            for c, weight in zip(SEARCH_COLUMNS, "ABC")
+        )
+        connection.exec_driver_sql(
+            f"ALTER TABLE donations ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR} tsvector"
+            f" GENERATED ALWAYS AS ({vector}) STORED"
+        )
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_donations_{SEARCH_VECTOR} ON donations USING gin ({SEARCH_VECTOR})"
+        )
+
+@event.listens_for(Base.metadata, "before_drop")
+def drop_donation_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        # The triggers go with the donations table
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
@@ -0,0 +1,142 @@
+# notification_counters.py
+from collections import Counter
+from sqlalchemy import event, func, inspect, or_, select, update, delete, insert
+from sqlalchemy.orm import Session
+from models import Notification, NotificationCounter
+
+counters = NotificationCounter.__table__
+
+
+def _upsert(dialect_name):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(counters)
+
+
+def apply_unread_deltas(connection, deltas):
+    """
+    Add {organization_id: delta} to the unread counters in one statement,
+    on the caller's connection so it commits or rolls back with the change
+    that caused it
+    """
+    rows = [
+        {"organization_id": organization_id, "unread_count": delta}
+        for organization_id, delta in deltas.items() if organization_id is not None and delta
+    ]
+    if not rows:
+        return
+    statement = _upsert(connection.dialect.name).values(rows)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[counters.c.organization_id],
+        set_={"unread_count": counters.c.unread_count + statement.excluded.unread_count}
+    ))
+
+
+def _is_unread(is_read):
+    # Same as the `is_read = false` filter: NULL is neither read nor unread
+    return is_read is not None and not is_read
+
+
+def record_inserted(db, notifications):
+    """Count notifications written with bulk_insert_mappings, which skips flush events"""
+    apply_unread_deltas(db.connection(), Counter(
+        n["organization_id"] for n in notifications if _is_unread(n.get("is_read", False))
+    ))
+
+
+def mark_read(db, *conditions):
+    """
+    Mark the unread notifications matching conditions as read in one UPDATE
+    and take them off their organizations' counters. Returns
+    {organization_id: notifications marked}; the caller commits.
+    """
+    organization_ids = db.execute(
+        update(Notification)
+        .where(Notification.is_read == False, *conditions)
+        .values(is_read=True)
+        .returning(Notification.organization_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    marked = Counter(organization_ids)
+    apply_unread_deltas(db.connection(), {organization_id: -n for organization_id, n in marked.items()})
+    return marked
+
+
+def id_selection(ids=(), ranges=(), before_id=None):
+    """
+    WHERE clause for explicit ids, inclusive (first, last) id ranges and
+    "everything up to a cursor"; None when nothing is selected
+    """
+    clauses = []
+    if ids:
+        clauses.append(Notification.id.in_(ids))
+    clauses.extend(Notification.id.between(first, last) for first, last in ranges)
+    if before_id is not None:
+        clauses.append(Notification.id <= before_id)
+    return or_(*clauses) if clauses else None
+
+
+def unread_count(db, organization_id):
+    return db.execute(
+        select(NotificationCounter.unread_count).where(NotificationCounter.organization_id == organization_id)
+    ).scalar() or 0
+
+
+def _recount(connection):
+    connection.execute(delete(counters))
+    connection.execute(insert(counters).from_select(
+        ["organization_id", "unread_count"],
+        select(Notification.organization_id, func.count())
+        .where(Notification.is_read == False, Notification.organization_id.is_not(None))
+        .group_by(Notification.organization_id)
+    ))
+
+
+def rebuild(db):
+    """Recount every organization from the notifications table, e.g. after a migration"""
+    _recount(db.connection())
+    db.commit()
+
+
+@event.listens_for(NotificationCounter.metadata, "after_create")
+def backfill_new_counters(target, connection, tables=(), **kw):
+    """
+    Fill the counters when create_all adds them to a database that already
+    has notifications; otherwise every existing unread notification would be
+    missing from its count and marking it read would push the count below 0
+    """
+    if counters in tables:
+        _recount(connection)
+
+
+@event.listens_for(Notification.is_read, "set", active_history=True)
+def load_previous_read_state(target, value, oldvalue, initiator):
+    """Registered with active_history so flushes know what is_read changed from"""
+
+
+@event.listens_for(Session, "before_flush")
+def load_deleted_read_state(session, flush_context, instances):
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            obj.is_read  # load it while the row still exists
+
+
+@event.listens_for(Session, "after_flush")
+def count_flushed_notifications(session, flush_context):
+    """Keep the counters in step with notifications added, read or deleted through the ORM"""
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Notification) and _is_unread(obj.is_read):
+            deltas[obj.organization_id] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes():
+                was_unread = any(_is_unread(value) for value in history.deleted)
+                deltas[obj.organization_id] += int(_is_unread(obj.is_read)) - int(was_unread)
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and _is_unread(obj.is_read):
+            deltas[obj.organization_id] -= 1
+    apply_unread_deltas(session.connection(), deltas)
@@ -0,0 +1,282 @@
+# profiling.py
+import asyncio
+import cProfile
+import marshal
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from lazy import optional_import
+
+PROFILE_DIR = os.getenv("FOODBRIDGE_PROFILE_DIR", "profiles")
+MAX_PROFILES = int(os.getenv("FOODBRIDGE_MAX_PROFILES", "50"))
+
+PROFILE_MODES = ("cprofile", "sampling")
+PROFILE_NAME_PATTERN = re.compile(r"^[\w.\-]+\.(pstats|speedscope\.json)$")
+
+# Profiling requested for the current request or job; None when off
+_profile_request = ContextVar("foodbridge_profile_request", default=None)
+# One profile at a time per process: concurrent profiles would record each
+# other's work, and on Python 3.12+ a second cProfile cannot be enabled while
+# one is active. Nested and concurrent profiled() calls run unprofiled.
+_profiler_lock = threading.Lock()
+# Set while a call in this context is being profiled, so nested calls are not counted as skipped
+_inside_profile = ContextVar("foodbridge_inside_profile", default=False)
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring buffer of profiles; the oldest files are removed
+    once more than max_profiles are stored
+    """
+
+    def __init__(self, directory=PROFILE_DIR, max_profiles=MAX_PROFILES):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.lock = threading.Lock()
+
+    def _files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = [n for n in os.listdir(self.directory) if PROFILE_NAME_PATTERN.match(n)]
+        return sorted(names, key=lambda n: os.path.getmtime(os.path.join(self.directory, n)))
+
+    def save(self, label, mode, data):
+        os.makedirs(self.directory, exist_ok=True)
+        extension = "pstats" if mode == "cprofile" else "speedscope.json"
+        safe_label = re.sub(r"[^\w\-]", "_", label)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 1_000_000:06d}-{safe_label}.{extension}"
+
+        with self.lock:
+            with open(os.path.join(self.directory, name), "wb") as f:
+                f.write(data)
+            for old in self._files()[:-self.max_profiles]:
+                os.remove(os.path.join(self.directory, old))
+        return name
+
+    def list(self):
+        profiles = []
+        for name in reversed(self._files()):
+            path = os.path.join(self.directory, name)
+            profiles.append({
+                "name": name,
+                "size_bytes": os.path.getsize(path),
+                "created_at": os.path.getmtime(path),
+            })
+        return profiles
+
+    def path(self, name):
+        """Absolute path of a stored profile, or None for unknown or unsafe names"""
+        if not PROFILE_NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+store = ProfileStore()
+
+
+class ProfileRequest:
+    def __init__(self, mode="cprofile", profile_store=None, min_seconds=0.0):
+        if mode == "sampling" and optional_import("pyinstrument") is None:
+            mode = "cprofile"  # pyinstrument is not installed
+        self.mode = mode
+        self.store = profile_store  # None for the module's store
+        self.min_seconds = min_seconds  # profiles of faster calls are dropped
+        self.saved = []
+        self.skipped = 0  # profiled() calls that ran while another profile was active
+
+    def keep(self, label, profiler, elapsed):
+        if elapsed >= self.min_seconds:
+            self.saved.append((self.store or store).save(label, self.mode, profiler.dump()))
+
+
+def parse_profile_flag(value):
+    """Map a header/query value to a profile mode, or None when profiling is not requested"""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in PROFILE_MODES:
+        return value
+    if value in ("1", "true", "yes", "on"):
+        return "cprofile"
+    return None
+
+
+@contextmanager
+def request_profile(mode="cprofile", profile_store=None, min_seconds=0.0):
+    """
+    Profile every profiled() call made inside this block, e.g. one request or
+    job, into profile_store (the module's store by default). Calls faster than
+    min_seconds are not kept, so callers can ask for slow ones only.
+    """
+    profile = ProfileRequest(mode, profile_store, min_seconds)
+    token = _profile_request.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile_request.reset(token)
+
+
+def requested_mode():
+    """Profile mode requested for the current request or job, or None"""
+    profile = _profile_request.get()
+    return None if profile is None else profile.mode
+
+
+class _Forward:
+    """Pass a value a coroutine yielded on to the event loop and return what it sends back"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return (yield self.value)
+
+
+async def _step_profiled(coro, profiler):
+    """
+    Run a coroutine with the profiler enabled only while the coroutine itself
+    executes, so work done by other tasks while it awaits is not recorded
+    """
+    value, error = None, None
+    while True:
+        profiler.enable()
+        try:
+            yielded = coro.send(value) if error is None else coro.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            profiler.disable()
+        try:
+            value, error = await _Forward(yielded), None
+        except BaseException as e:  # including cancellation, which the coroutine must see
+            value, error = None, e
+
+
+class _Profiler:
+    """cProfile or pyinstrument behind one enable/disable/dump interface"""
+
+    def __init__(self, mode, async_mode):
+        self.mode = mode
+        if mode == "sampling":
+            self.profiler = optional_import("pyinstrument").Profiler(async_mode=async_mode)
+        else:
+            self.profiler = cProfile.Profile()
+
+    def enable(self):
+        if self.mode == "sampling":
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def disable(self):
+        if self.mode == "sampling":
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def dump(self):
+        if self.mode == "sampling":
+            return self.profiler.output(optional_import("pyinstrument.renderers").SpeedscopeRenderer()).encode()
+        return dump_pstats(self.profiler)
+
+
+def _claim_profiler():
+    """The current ProfileRequest if this call should be profiled, holding the process-wide guard"""
+    profile = _profile_request.get()
+    if profile is None or _inside_profile.get():
+        return None
+    if not _profiler_lock.acquire(blocking=False):
+        profile.skipped += 1
+        return None
+    return profile
+
+
+@contextmanager
+def maybe_profile(label):
+    profile = _claim_profiler()
+    if profile is None:
+        yield
+        return
+
+    token = _inside_profile.set(True)
+    try:
+        profiler = _Profiler(profile.mode, async_mode="disabled")
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profile.keep(label, profiler, time.perf_counter() - started)
+    finally:
+        _inside_profile.reset(token)
+        _profiler_lock.release()
+
+
+async def maybe_profile_coroutine(label, coro):
+    profile = _claim_profiler()
+    if profile is None:
+        return await coro
+
+    token = _inside_profile.set(True)
+    try:
+        started = time.perf_counter()
+        if profile.mode == "sampling":
+            # pyinstrument attributes awaited time to this task by itself
+            profiler = _Profiler(profile.mode, async_mode="strict")
+            profiler.enable()
+            try:
+                return await coro
+            finally:
+                profiler.disable()
+                profile.keep(label, profiler, time.perf_counter() - started)
+        profiler = _Profiler(profile.mode, async_mode="disabled")
+        try:
+            return await _step_profiled(coro, profiler.profiler)
+        finally:
+            profile.keep(label, profiler, time.perf_counter() - started)
+    finally:
+        _inside_profile.reset(token)
+        _profiler_lock.release()
+
+
+def dump_pstats(profiler):
+    # Same format as Profile.dump_stats, loadable with pstats.Stats or snakeviz
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def profiled(fn, label=None):
+    """
+    Wrap a function so it is profiled when profiling was requested for the
+    current request or job. Profiling runs in the thread executing the call,
+    so sync endpoints running in the threadpool are captured too; coroutines
+    are only profiled while they run, not while they await.
+    """
+    label = label or fn.__qualname__
+
+    if asyncio.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            return await maybe_profile_coroutine(label, fn(*args, **kwargs))
+        return async_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with maybe_profile(label):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def profile_methods(*names):
+    """Class decorator applying profiled() to the named methods"""
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, profiled(getattr(cls, name), f"{cls.__name__}.{name}"))
+        return cls
+    return decorate
@@ -0,0 +1,316 @@
+# push.py
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from models import Notification
+
+logger = logging.getLogger(__name__)
+
+# "database" tails the notifications table, so rows written by job workers
+# in other processes are pushed too; "memory" only sees this process's commits
+PUSH_BROKER = os.getenv("FOODBRIDGE_PUSH_BROKER", "database")
+TAIL_INTERVAL = float(os.getenv("FOODBRIDGE_PUSH_TAIL_INTERVAL", "1.0"))
+# On PostgreSQL an id is assigned at insert but the row only becomes visible
+# at commit, so a lower id can appear after a higher one was pushed. The
+# database tail re-reads ids above where it stood this many seconds ago.
+TAIL_LOOKBACK_SECONDS = float(os.getenv("FOODBRIDGE_PUSH_TAIL_LOOKBACK", "30"))
+SUBSCRIBER_QUEUE_SIZE = 1000
+BACKLOG_LIMIT = 500  # rows per backlog page
+
+
+def serialize_notification(notification):
+    return {
+        "id": notification.id,
+        "organization_id": notification.organization_id,
+        "donation_id": notification.donation_id,
+        "message": notification.message,
+        "notification_type": notification.notification_type,
+        "relevance_score": notification.relevance_score,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+        "is_read": bool(notification.is_read),
+    }
+
+
+class Subscription:
+    def __init__(self, organization_id, last_id, loop):
+        self.organization_id = organization_id
+        self.last_id = last_id  # highest id delivered
+        self.since_id = last_id  # the client had everything up to here when it connected
+        self.loop = loop
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        # Ids delivered recently, so an event seen in both the backlog and the
+        # live feed is sent once while late-committed lower ids still go out
+        self.recent = deque(maxlen=2 * SUBSCRIBER_QUEUE_SIZE)
+        self.recent_ids = set()
+        # Set when the client fell behind; it should reconnect with its last id
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Record an event as delivered; False when it was already sent"""
+        if event["id"] <= self.since_id or event["id"] in self.recent_ids:
+            return False
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_ids.discard(self.recent[0])
+        self.recent.append(event["id"])
+        self.recent_ids.add(event["id"])
+        self.last_id = max(self.last_id, event["id"])
+        return True
+
+    def offer(self, event):
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def events(self, heartbeat=15.0):
+        """
+        Yield notification dicts as they arrive, or None as a heartbeat when
+        nothing arrived for heartbeat seconds. Stops after an overflow.
+        """
+        while not self.overflowed:
+            try:
+                event = await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if self.deliver(event):
+                yield event
+
+
+class NotificationHub:
+    """
+    In-process pub/sub of new notifications keyed by organization.
+    publish() may be called from any thread; events are delivered on each
+    subscriber's own event loop.
+    """
+
+    def __init__(self):
+        self.subscriptions = {}  # organization_id -> set of Subscription
+        self.lock = threading.Lock()
+
+    def subscribe(self, organization_id, last_id=0):
+        subscription = Subscription(organization_id, last_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions.setdefault(organization_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscriptions.get(subscription.organization_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[subscription.organization_id]
+
+    def has_subscribers(self):
+        return bool(self.subscriptions)
+
+    def publish(self, event):
+        with self.lock:
+            subscribers = list(self.subscriptions.get(event["organization_id"], ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.offer, event)
+
+
+hub = NotificationHub()
+
+
+class Broker:
+    """Feeds newly committed notifications into the hub"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class InProcessBroker(Broker):
+    """Publishes notifications committed through ORM sessions in this process"""
+
+    def __init__(self, hub):
+        super().__init__(hub)
+        self.active = False
+        self.registered = False
+
+    async def start(self):
+        # Listeners stay registered; removing them could race with commits in other threads
+        if not self.registered:
+            event.listen(Session, "after_flush", self._collect)
+            event.listen(Session, "after_commit", self._publish)
+            event.listen(Session, "after_rollback", self._discard)
+            self.registered = True
+        self.active = True
+
+    async def stop(self):
+        self.active = False
+
+    def _collect(self, session, flush_context):
+        if not self.active:
+            return
+        # Serialize now: ids are assigned and no SQL may be emitted after commit
+        new = [serialize_notification(obj) for obj in session.new if isinstance(obj, Notification)]
+        if new:
+            session.info.setdefault("pending_notifications", []).extend(new)
+
+    def _publish(self, session):
+        for event in sorted(session.info.pop("pending_notifications", []), key=lambda e: e["id"]):
+            self.hub.publish(event)
+
+    def _discard(self, session):
+        session.info.pop("pending_notifications", None)
+
+
+class DatabaseTailBroker(Broker):
+    """
+    Polls the notifications table by id once per interval for all
+    subscribers together, so rows written by any process are pushed.
+    One indexed range query replaces every client's polling.
+
+    Ids above where the tail stood lookback seconds ago are re-checked on
+    every poll, and rows among them that were not pushed yet (committed
+    after a higher id) are pushed late rather than skipped.
+    """
+
+    def __init__(self, hub, session_factory, interval=TAIL_INTERVAL, lookback=TAIL_LOOKBACK_SECONDS):
+        super().__init__(hub)
+        self.session_factory = session_factory
+        self.interval = interval
+        self.lookback = lookback
+        self.last_id = None
+        self.checkpoints = deque()  # (monotonic time, last_id), oldest first
+        self.published = set()  # ids pushed above the lookback floor
+        self.task = None
+
+    def _max_id(self):
+        db = self.session_factory()
+        try:
+            return db.query(func.max(Notification.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def _reset(self, last_id):
+        self.last_id = last_id
+        self.checkpoints = deque([(time.monotonic(), last_id)])
+        self.published = set()
+
+    def _floor(self):
+        """Where the tail stood lookback seconds ago; ids above it are re-checked"""
+        horizon = time.monotonic() - self.lookback
+        while len(self.checkpoints) > 1 and self.checkpoints[1][0] <= horizon:
+            self.checkpoints.popleft()
+        floor = self.checkpoints[0][1]
+        self.published = {notification_id for notification_id in self.published if notification_id > floor}
+        return floor
+
+    def _fetch(self, floor):
+        db = self.session_factory()
+        try:
+            late = [
+                notification_id for notification_id, in db.query(Notification.id).filter(
+                    Notification.id > floor, Notification.id <= self.last_id
+                ) if notification_id not in self.published
+            ]
+            rows = db.query(Notification).filter(Notification.id.in_(late)).all() if late else []
+            rows += db.query(Notification).filter(
+                Notification.id > self.last_id
+            ).order_by(Notification.id).limit(BACKLOG_LIMIT).all()
+            return [serialize_notification(row) for row in rows]
+        finally:
+            db.close()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._reset(await loop.run_in_executor(None, self._max_id))
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if not self.hub.has_subscribers():
+                    self._reset(await loop.run_in_executor(None, self._max_id))
+                    continue
+                for event in await loop.run_in_executor(None, self._fetch, self._floor()):
+                    self.published.add(event["id"])
+                    self.last_id = max(self.last_id, event["id"])
+                    self.hub.publish(event)
+                self.checkpoints.append((time.monotonic(), self.last_id))
+            except Exception as e:
+                logger.error(f"Notification tail failed: {e}")
+
+
+BROKERS = {
+    "memory": lambda hub, session_factory: InProcessBroker(hub),
+    "database": lambda hub, session_factory: DatabaseTailBroker(hub, session_factory),
+}
+
+
+def register_broker(name, factory):
+    """factory(hub, session_factory) -> Broker"""
+    BROKERS[name] = factory
+
+
+def create_broker(session_factory, name=PUSH_BROKER):
+    if name not in BROKERS:
+        raise ValueError(f"Unknown push broker: {name}")
+    return BROKERS[name](hub, session_factory)
+
+
+def load_backlog(db, organization_id, last_id):
+    """One page of notifications the client missed since last_id, oldest first"""
+    rows = db.query(Notification).filter(
+        Notification.organization_id == organization_id,
+        Notification.id > last_id
+    ).order_by(Notification.id).limit(BACKLOG_LIMIT).all()
+    return [serialize_notification(row) for row in rows]
+
+
+async def replay_backlog(session_factory, subscription):
+    """
+    Yield everything the subscriber missed since it connected, a page at a
+    time until caught up. Live events that arrive meanwhile wait in the
+    subscription's queue and are skipped there if the backlog sent them.
+    """
+    loop = asyncio.get_running_loop()
+
+    def load(after_id):
+        db = session_factory()
+        try:
+            return load_backlog(db, subscription.organization_id, after_id)
+        finally:
+            db.close()
+
+    after_id = subscription.since_id
+    while True:
+        page = await loop.run_in_executor(None, load, after_id)
+        for event in page:
+            if subscription.deliver(event):
+                yield event
+        if len(page) < BACKLOG_LIMIT:
+            return
+        after_id = page[-1]["id"]
+
+
+def format_sse(event):
+    """One Server-Sent Events frame; None becomes a keep-alive comment"""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
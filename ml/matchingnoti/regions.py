@@ -0,0 +1,98 @@
+# regions.py
+import math
+import zlib
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+KM_PER_DEGREE = 6371.0088 * math.pi / 180
+
+
+def geohash(latitude, longitude, precision):
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def cells_within(latitude, longitude, radius_km, precision):
+    """
+    Geohash cells intersecting the bounding box of a circle; a superset of
+    the cells holding any point within radius_km of (latitude, longitude)
+    """
+    height, width = cell_size(precision)
+    d_lat = radius_km / KM_PER_DEGREE
+    lat_min, lat_max = max(-90.0, latitude - d_lat), min(90.0, latitude + d_lat)
+    cos_lat = min(math.cos(math.radians(lat_min)), math.cos(math.radians(lat_max)))
+    if cos_lat <= 1e-6 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        lon_min, lon_max = -180.0, 180.0 - 1e-9  # the box wraps the whole globe
+    else:
+        d_lon = radius_km / (KM_PER_DEGREE * cos_lat)
+        lon_min, lon_max = longitude - d_lon, longitude + d_lon
+
+    # Samples at most one cell apart, ends included, hit every cell in the box
+    lat_steps = max(1, math.ceil((lat_max - lat_min) / height))
+    lon_steps = max(1, math.ceil((lon_max - lon_min) / width))
+    cells = set()
+    for i in range(lat_steps + 1):
+        lat = min(lat_min + i * height, lat_max)
+        for j in range(lon_steps + 1):
+            lon = min(lon_min + j * width, lon_max)
+            cells.add(geohash(lat, (lon + 180.0) % 360.0 - 180.0, precision))
+    return cells
+
+
+def shard_of(cell, shards):
+    # crc32 rather than hash() so every process agrees on the owner
+    return zlib.crc32(cell.encode()) % shards
+
+
+def shard_for(latitude, longitude, shards, precision):
+    """The shard owning the cell of a point"""
+    return shard_of(geohash(latitude, longitude, precision), shards)
+
+
+class Region:
+    """
+    The geohash cells owned by one of `shards` shards. Cells are spread over
+    the shards by hash, so coarser precisions keep regions contiguous and
+    finer ones balance dense areas better.
+    """
+
+    def __init__(self, shard, shards, precision):
+        self.shard = shard
+        self.shards = shards
+        self.precision = precision
+
+    def __repr__(self):
+        return f"Region(shard={self.shard}, shards={self.shards}, precision={self.precision})"
+
+    def owns(self, latitude, longitude):
+        return shard_for(latitude, longitude, self.shards, self.precision) == self.shard
+
+    def covers(self, latitude, longitude, halo_km):
+        """True when the point is within halo_km of one of the region's cells"""
+        return any(
+            shard_of(cell, self.shards) == self.shard
+            for cell in cells_within(latitude, longitude, halo_km, self.precision)
+        )
@@ -0,0 +1,183 @@
+# response_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Organization, Donation, Claim, FoodCategoryPreference, AllergenRestriction, \
+    OrganizationCategoryAcceptance
+from lazy import optional_import
+
+# "memory" for a per-process LRU, or redis://host:port/db to share entries
+# and invalidations between API and worker processes. With "memory",
+# invalidations made by worker.py processes (expiry, matching jobs,
+# update_matching_model) never reach the API's cache, so entries can stay
+# stale for up to FOODBRIDGE_CACHE_TTL: use redis:// whenever workers run,
+# or keep the TTL short.
+CACHE_BACKEND = os.getenv("FOODBRIDGE_CACHE_BACKEND", "memory")
+DEFAULT_TTL = float(os.getenv("FOODBRIDGE_CACHE_TTL", "60"))
+MAX_ENTRIES = int(os.getenv("FOODBRIDGE_CACHE_MAX_ENTRIES", "10000"))
+
+# Tag covering everything derived from the set of available donations
+DONATIONS_TAG = "donations"
+
+
+def organization_tag(organization_id):
+    return f"org:{organization_id}"
+
+
+class MemoryBackend:
+    """
+    In-process LRU with per-entry expiry. Tag version counters live in a
+    separate dict that is never evicted: losing one would reset the tag to
+    version 0 and make entries invalidated under it servable again.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.counters = {}  # key -> value, for incr()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self.lock:
+            for key in keys:
+                if key in self.counters:
+                    values.append(self.counters[key])
+                    continue
+                entry = self.entries.get(key)
+                if entry is None or entry[0] < now:
+                    self.entries.pop(key, None)
+                    values.append(None)
+                else:
+                    self.entries.move_to_end(key)
+                    values.append(entry[1])
+        return values
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def incr(self, key):
+        with self.lock:
+            # One small int per tag ever invalidated; never expired or evicted
+            value = self.counters[key] = self.counters.get(key, 0) + 1
+            return value
+
+
+class RedisBackend:
+    """Shared backend on Redis; requires the redis package"""
+
+    def __init__(self, url):
+        redis = optional_import("redis")
+        if redis is None:
+            raise ImportError("The redis package is required for a redis:// cache backend")
+        self.client = redis.Redis.from_url(url)
+
+    def get_many(self, keys):
+        return [None if v is None else json.loads(v) for v in self.client.mget(keys)]
+
+    def set(self, key, value, ttl):
+        self.client.set(key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class ResponseCache:
+    """
+    Rendered-response cache with tag-based invalidation.
+
+    Each entry's key includes the current version of each of its tags, so
+    invalidating a tag just bumps its version: stale entries are never read
+    again and age out of the LRU. This works unchanged on a shared backend.
+    """
+
+    def __init__(self, backend, default_ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+
+    def _versioned_key(self, key, tags):
+        versions = self.backend.get_many([f"tag:{tag}" for tag in tags]) if tags else []
+        suffix = ",".join(f"{tag}={version or 0}" for tag, version in zip(tags, versions))
+        return f"response:{key}|{suffix}"
+
+    def lookup(self, key, tags):
+        """
+        Returns (versioned_key, entry or None). Store a fresh entry under the
+        returned key: if a write lands while the response is being built, the
+        key is already outdated and the entry can never be served.
+        """
+        versioned_key = self._versioned_key(key, tags)
+        return versioned_key, self.backend.get_many([versioned_key])[0]
+
+    def store(self, versioned_key, entry, ttl=None):
+        self.backend.set(versioned_key, entry, self.default_ttl if ttl is None else ttl)
+
+    def invalidate(self, tags):
+        for tag in set(tags):
+            self.backend.incr(f"tag:{tag}")
+
+
+def create_backend(spec=CACHE_BACKEND):
+    if spec == "memory":
+        return MemoryBackend()
+    if urlparse(spec).scheme in ("redis", "rediss"):
+        return RedisBackend(spec)
+    raise ValueError(f"Unknown cache backend: {spec}")
+
+
+cache = ResponseCache(create_backend())
+
+
+def etag_for(body):
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def tags_for(obj):
+    """Cache tags made stale by a change to this ORM object"""
+    if isinstance(obj, Organization):
+        tags = [organization_tag(obj.id)]
+        if obj.org_type == "donor":
+            tags.append(DONATIONS_TAG)  # match listings show donor details
+        return tags
+    if isinstance(obj, (FoodCategoryPreference, AllergenRestriction, OrganizationCategoryAcceptance)):
+        return [organization_tag(obj.organization_id)]
+    if isinstance(obj, (Donation, Claim)):
+        return [DONATIONS_TAG]
+    return []
+
+
+@event.listens_for(Session, "after_flush")
+def collect_stale_tags(session, flush_context):
+    tags = session.info.setdefault("stale_cache_tags", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.update(tags_for(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_stale_tags(session):
+    tags = session.info.pop("stale_cache_tags", None)
+    if tags:
+        cache.invalidate(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_stale_tags(session):
+    session.info.pop("stale_cache_tags", None)
@@ -0,0 +1,137 @@
+# scoring.py
+import numpy as np
+from lazy import optional_import
+
+# Column order of the candidate sub-score matrix built by MatchingEngine
+SUB_SCORES = (
+    "perishability",
+    "category",
+    "distance",
+    "storage",
+    "allergen",
+    "historical",
+    "capacity",
+)
+
+DEFAULT_WEIGHTS = {
+    "perishability": 0.15,
+    "category": 0.20,
+    "distance": 0.25,
+    "storage": 0.10,
+    "allergen": 0.05,
+    "historical": 0.15,
+    "capacity": 0.10,
+}
+
+# A candidate is dropped when any of these sub-scores is not above its threshold
+DEFAULT_HARD_FILTERS = {
+    "category": 0.0,
+    "storage": 0.0,
+    "allergen": 0.0,
+    "distance": 0.0,
+}
+
+
+def _numpy_kernel(scores, weights, filter_columns, thresholds):
+    overall = scores @ weights
+    if len(filter_columns):
+        mask = np.all(scores[:, filter_columns] > thresholds, axis=1)
+    else:
+        mask = np.ones(len(scores), dtype=np.bool_)
+    return overall, mask
+
+
+def _loop_kernel(scores, weights, filter_columns, thresholds):
+    # Single pass over the rows; compiled with numba by numba_kernel()
+    n, k = scores.shape
+    overall = np.empty(n)
+    mask = np.ones(n, dtype=np.bool_)
+    for i in range(n):
+        total = 0.0
+        for j in range(k):
+            total += scores[i, j] * weights[j]
+        overall[i] = total
+        for f in range(len(filter_columns)):
+            if scores[i, filter_columns[f]] <= thresholds[f]:
+                mask[i] = False
+                break
+    return overall, mask
+
+
+_numba_kernel = None
+
+
+def numba_kernel():
+    """The numba-compiled kernel, built on first use; None when numba is not installed"""
+    global _numba_kernel
+    if _numba_kernel is None:
+        numba = optional_import("numba")
+        if numba is None:
+            return None
+        _numba_kernel = numba.njit(cache=True)(_loop_kernel)
+    return _numba_kernel
+
+
+class ScoringConfig:
+    """
+    Declares the sub-scores, their weights and the hard-filter thresholds
+    used to rank match candidates. compile() turns the configuration into a
+    kernel over an (n_candidates, len(SUB_SCORES)) matrix of sub-scores.
+    """
+
+    def __init__(self, weights=None, hard_filters=None, name="default", use_numba=True):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.hard_filters = dict(DEFAULT_HARD_FILTERS if hard_filters is None else hard_filters)
+        self.name = name
+        self.use_numba = use_numba
+
+        unknown = (set(self.weights) | set(self.hard_filters)) - set(SUB_SCORES)
+        if unknown:
+            raise ValueError(f"Unknown sub-scores: {sorted(unknown)}")
+
+        self.weight_vector = np.array([self.weights.get(s, 0.0) for s in SUB_SCORES])
+        self.filter_columns = np.array([SUB_SCORES.index(s) for s in self.hard_filters], dtype=np.int64)
+        self.thresholds = np.array(list(self.hard_filters.values()), dtype=np.float64)
+        self._kernel = None
+
+    def compile(self):
+        if self._kernel is None:
+            kernel = (numba_kernel() if self.use_numba else None) or _numpy_kernel
+            weights, columns, thresholds = self.weight_vector, self.filter_columns, self.thresholds
+            self._kernel = lambda scores: kernel(
+                np.ascontiguousarray(scores, dtype=np.float64), weights, columns, thresholds
+            )
+        return self._kernel
+
+    def score(self, scores):
+        """Return (overall_score, passes_filters) arrays for a sub-score matrix"""
+        return self.compile()(scores)
+
+
+DEFAULT_SCORING = ScoringConfig()
+
+
+def rank(overall, mask, limit):
+    """Indices of the top `limit` candidates that pass the filters, best first"""
+    candidates = np.flatnonzero(mask)
+    order = np.argsort(-overall[candidates], kind="stable")
+    return candidates[order[:limit]]
+
+
+def evaluate_variants(scores, configs):
+    """
+    Score the same candidate matrix under several configurations at once.
+    Weighted sums for every variant come from a single matrix product.
+    Returns {config.name: (overall_score, passes_filters)}.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    overall = scores @ np.column_stack([c.weight_vector for c in configs])
+
+    results = {}
+    for i, config in enumerate(configs):
+        if len(config.filter_columns):
+            mask = np.all(scores[:, config.filter_columns] > config.thresholds, axis=1)
+        else:
+            mask = np.ones(len(scores), dtype=bool)
+        results[config.name] = (overall[:, i], mask)
+    return results
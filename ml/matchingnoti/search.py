@@ -0,0 +1,44 @@
+# search.py
+import re
+from sqlalchemy import Integer, column, func, literal_column, table
+from models import Donation, SEARCH_TABLE, SEARCH_VECTOR
+import serialization
+
+# bm25 column weights in SEARCH_COLUMNS order (title, subcategory,
+# description); PostgreSQL gets the same order from setweight A/B/C
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Queries are cut to this many words so a pasted paragraph stays cheap
+MAX_TERMS = 16
+
+WORD = re.compile(r"\w+")
+
+
+def terms(text):
+    """
+    Lowercased words of a search box query. Operators and quotes are
+    dropped, so user input never reaches the FTS query syntax.
+    """
+    return WORD.findall(text.lower())[:MAX_TERMS]
+
+
+def search_donations(db, words, *conditions, skip=0, limit=100):
+    """
+    DONATION_COLUMNS rows containing every word (or a word starting with
+    it, for search-as-you-type) and matching conditions, most relevant
+    first. Filtering, ranking and paging happen in the one query.
+    """
+    query = serialization.select_donations().where(*conditions)
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = func.to_tsquery("english", " & ".join(f"{word}:*" for word in words))
+        vector = literal_column(f"donations.{SEARCH_VECTOR}")
+        query = query.where(vector.op("@@")(tsquery)).order_by(func.ts_rank(vector, tsquery).desc(), Donation.id)
+    else:
+        index = table(SEARCH_TABLE, column("rowid", Integer))
+        fts = literal_column(SEARCH_TABLE)
+        query = (
+            query.join(index, index.c.rowid == Donation.id)
+            .where(fts.op("MATCH")(" ".join(f'"{word}"*' for word in words)))
+            .order_by(func.bm25(fts, *BM25_WEIGHTS), Donation.id)
+        )
+    return db.execute(query.offset(skip).limit(limit)).all()
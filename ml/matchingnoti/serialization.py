@@ -0,0 +1,152 @@
+# serialization.py
+import json
+from datetime import date, datetime
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from models import Donation, DonationAllergen, Notification
+from lazy import optional_import
+
+# Donation ids per allergen lookup; stays under SQLite's bound-parameter limit
+IN_CLAUSE_BATCH = 5000
+
+# Columns behind DonationResponse and NotificationResponse, selected as plain
+# tuples so listings never build ORM objects
+DONATION_COLUMNS = (
+    Donation.id,
+    Donation.title,
+    Donation.description,
+    Donation.quantity,
+    Donation.unit,
+    Donation.category,
+    Donation.expiration_date,
+    Donation.storage_requirements,
+    Donation.available_from,
+    Donation.available_until,
+    Donation.status,
+    Donation.created_at,
+    Donation.donor_organization_id,
+)
+
+NOTIFICATION_COLUMNS = (
+    Notification.id,
+    Notification.message,
+    Notification.notification_type,
+    Notification.donation_id,
+    Notification.created_at,
+    Notification.is_read,
+)
+
+# NotificationResponse.urgency_level has no column yet; this is its schema default
+DEFAULT_URGENCY_LEVEL = 1
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stdlib_dumps(content):
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def dumps(content):
+    """
+    JSON bytes for API responses, using orjson when it is installed and the
+    stdlib encoder otherwise. Both render datetimes in ISO format like
+    jsonable_encoder does, so the output is the same either way.
+    """
+    orjson = optional_import("orjson")
+    if orjson is not None:
+        return orjson.dumps(content)
+    return stdlib_dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps(). Returning one from an endpoint skips
+    the response_model round trip, so content must already match the schema.
+    """
+
+    def render(self, content):
+        return dumps(content)
+
+
+def select_donations():
+    return select(*DONATION_COLUMNS)
+
+
+def select_notifications():
+    return select(*NOTIFICATION_COLUMNS)
+
+
+def allergens_by_donation(db, donation_ids):
+    """donation id -> allergen list, loaded in a few IN queries"""
+    allergens = {}
+    for start in range(0, len(donation_ids), IN_CLAUSE_BATCH):
+        batch = donation_ids[start:start + IN_CLAUSE_BATCH]
+        for donation_id, allergen in db.execute(
+            select(DonationAllergen.donation_id, DonationAllergen.allergen)
+            .where(DonationAllergen.donation_id.in_(batch))
+            .order_by(DonationAllergen.id)
+        ):
+            allergens.setdefault(donation_id, []).append(allergen)
+    return allergens
+
+
+def snapshot_locator(snapshot):
+    """
+    donor organization id -> {"latitude", "longitude"} from the organization
+    snapshot's geocoded coordinates, or None for unknown organizations
+    """
+    locations = {}
+
+    def locate(organization_id):
+        if organization_id not in locations:
+            row = snapshot.index.get(organization_id)
+            locations[organization_id] = None if row is None else {
+                "latitude": float(snapshot.latitude[row]),
+                "longitude": float(snapshot.longitude[row]),
+            }
+        return locations[organization_id]
+    return locate
+
+
+def donation_documents(rows, allergens, locate):
+    """
+    DonationResponse-shaped dicts from DONATION_COLUMNS rows. Rows come
+    straight from the database, so they are not validated one by one.
+    """
+    return [{
+        "title": title,
+        "description": description,
+        "quantity": quantity,
+        "unit": unit,
+        "category": category,
+        "expiration_date": expiration_date,
+        "storage_requirements": storage_requirements,
+        "pickup_window_start": available_from,
+        "pickup_window_end": available_until,
+        "location": locate(donor_organization_id),
+        "allergens": allergens.get(donation_id, []),
+        "id": donation_id,
+        "status": status,
+        "created_at": created_at,
+        # Donations don't track edits separately; creation is the last update
+        "updated_at": created_at,
+    } for (donation_id, title, description, quantity, unit, category, expiration_date, storage_requirements,
+           available_from, available_until, status, created_at, donor_organization_id) in rows]
+
+
+def notification_documents(rows):
+    """NotificationResponse-shaped dicts from NOTIFICATION_COLUMNS rows"""
+    return [{
+        "message": message,
+        "notification_type": notification_type,
+        "donation_id": donation_id,
+        "urgency_level": DEFAULT_URGENCY_LEVEL,
+        "id": notification_id,
+        "created_at": created_at,
+        "is_read": bool(is_read),
+    } for notification_id, message, notification_type, donation_id, created_at, is_read in rows]
@@ -0,0 +1,332 @@
+# snapshot.py
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Organization, FoodCategoryPreference, AllergenRestriction, FoodCategory, AllergenType
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Change events only reach the snapshot of the process that made the change,
+# so snapshots are fully reloaded after this many seconds to pick up writes
+# from other workers
+MAX_AGE_SECONDS = float(os.getenv("FOODBRIDGE_SNAPSHOT_MAX_AGE", "60"))
+
+DEFAULT_MAX_DISTANCE_KM = 20.0
+
+# Preference matrix entry for a category the organization has no row for.
+# Level 0 is a real preference ("not accepted") and must stay distinct.
+NO_PREFERENCE = np.iinfo(np.int8).min
+
+# Per-organization arrays; NAN_FIELDS default to NaN (unknown) rather than zero
+NAN_FIELDS = ("capacity_kg", "max_distance_km", "acceptance_rate")
+ARRAY_FIELDS = ("ids", "active", "is_donor", "has_refrigeration", "has_freezer", "has_dry_storage",
+                "allergen_mask", "has_preferences", "latitude", "longitude") + NAN_FIELDS
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; works elementwise on arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class OrganizationSnapshot:
+    """
+    Compact, read-only view of the organization fields matching needs,
+    stored as one numpy array per field with an id -> row index.
+    Category preferences are a dense (orgs x categories) level matrix,
+    NO_PREFERENCE where an organization has no row for the category, and
+    allergen restrictions a per-org bitmask, so matching never loads ORM
+    objects. A published snapshot is never rebuilt in place; SnapshotSource
+    applies changes to a copy and swaps it in.
+
+    With a region (see regions.py) only organizations within halo_km of the
+    region's cells are kept, where halo_km is the widest pickup radius seen
+    on the last full load. A donation in the region can then be matched
+    against every organization able to pick it up.
+    """
+
+    def __init__(self, geocode, region=None):
+        self.geocode = geocode  # (address, city, state, zip_code) -> (lat, lon)
+        self.region = region
+        self.halo_km = DEFAULT_MAX_DISTANCE_KM
+        # Guards the only in-place changes made once a snapshot is published:
+        # new preference columns and allergen bits
+        self.lock = threading.Lock()
+
+        self.category_index = {c.value: i for i, c in enumerate(FoodCategory)}
+        self.allergen_bits = {a.value: 1 << i for i, a in enumerate(AllergenType)}
+        self._reset(0)
+
+    def _reset(self, n):
+        self.index = {}
+        self.ids = np.zeros(n, dtype=np.int64)
+        self.names = [None] * n
+        self.active = np.zeros(n, dtype=bool)
+        self.is_donor = np.zeros(n, dtype=bool)
+        self.has_refrigeration = np.zeros(n, dtype=bool)
+        self.has_freezer = np.zeros(n, dtype=bool)
+        self.has_dry_storage = np.zeros(n, dtype=bool)
+        self.capacity_kg = np.full(n, np.nan)
+        self.max_distance_km = np.full(n, np.nan)
+        self.acceptance_rate = np.full(n, np.nan)
+        self.latitude = np.zeros(n)
+        self.longitude = np.zeros(n)
+        self.preferences = np.full((n, len(self.category_index)), NO_PREFERENCE, dtype=np.int8)
+        self.has_preferences = np.zeros(n, dtype=bool)
+        self.allergen_mask = np.zeros(n, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def category_column(self, category):
+        """Column of a category in the preference matrix, growing it for new categories"""
+        column = self.category_index.get(category)
+        if column is None:
+            with self.lock:
+                column = self.category_index.get(category)
+                if column is None:
+                    # Publish the wider matrix before the column that indexes into it
+                    self.preferences = np.hstack([
+                        self.preferences, np.full((len(self), 1), NO_PREFERENCE, dtype=np.int8)
+                    ])
+                    column = self.category_index[category] = len(self.category_index)
+        return column
+
+    def allergen_bit(self, allergen):
+        bit = self.allergen_bits.get(allergen)
+        if bit is None:
+            with self.lock:
+                bit = self.allergen_bits.get(allergen)
+                if bit is None:
+                    bit = self.allergen_bits[allergen] = 1 << len(self.allergen_bits)
+        return bit
+
+    def allergen_mask_of(self, allergens):
+        mask = 0
+        for allergen in allergens:
+            mask |= self.allergen_bit(allergen)
+        return mask
+
+    def copy(self):
+        """Unpublished copy that can be updated without disturbing readers of this one"""
+        clone = OrganizationSnapshot(self.geocode, region=self.region)
+        with self.lock:
+            clone.halo_km = self.halo_km
+            clone.category_index = dict(self.category_index)
+            clone.allergen_bits = dict(self.allergen_bits)
+            clone.index = dict(self.index)
+            clone.names = list(self.names)
+            for name in ARRAY_FIELDS + ("preferences",):
+                setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+    def _grow(self, extra):
+        n = len(self)
+        for name in ARRAY_FIELDS:
+            current = getattr(self, name)
+            if name in NAN_FIELDS:
+                padding = np.full(extra, np.nan)
+            else:
+                padding = np.zeros(extra, dtype=current.dtype)
+            setattr(self, name, np.concatenate([current, padding]))
+        self.preferences = np.vstack([
+            self.preferences, np.full((extra, self.preferences.shape[1]), NO_PREFERENCE, dtype=np.int8)
+        ])
+        self.names.extend([None] * extra)
+        return n
+
+    def _load(self, db, organization_ids=None):
+        org_query = db.query(
+            Organization.id, Organization.name, Organization.org_type,
+            Organization.address, Organization.city, Organization.state, Organization.zip_code,
+            Organization.has_refrigeration, Organization.has_freezer, Organization.has_dry_storage,
+            Organization.storage_capacity_kg, Organization.max_pickup_distance_km,
+            Organization.acceptance_rate
+        )
+        pref_query = db.query(
+            FoodCategoryPreference.organization_id,
+            FoodCategoryPreference.category,
+            FoodCategoryPreference.preference_level
+        )
+        allergen_query = db.query(AllergenRestriction.organization_id, AllergenRestriction.allergen)
+
+        if organization_ids is not None:
+            org_query = org_query.filter(Organization.id.in_(organization_ids))
+            pref_query = pref_query.filter(FoodCategoryPreference.organization_id.in_(organization_ids))
+            allergen_query = allergen_query.filter(AllergenRestriction.organization_id.in_(organization_ids))
+
+        return org_query.all(), pref_query.all(), allergen_query.all()
+
+    def _apply(self, rows, preferences, allergens, organization_ids=None):
+        coordinates = {
+            org.id: self.geocode(org.address, org.city, org.state, org.zip_code) for org in rows
+        }
+        if self.region is not None:
+            if organization_ids is None:
+                # A radius widened by an incremental update is picked up by the next full load
+                self.halo_km = max([
+                    DEFAULT_MAX_DISTANCE_KM if org.max_pickup_distance_km is None else org.max_pickup_distance_km
+                    for org in rows
+                ], default=DEFAULT_MAX_DISTANCE_KM)
+            rows = [org for org in rows if self.region.covers(*coordinates[org.id], self.halo_km)]
+        
+        new_ids = [row.id for row in rows if row.id not in self.index]
+        if new_ids:
+            start = self._grow(len(new_ids))
+            for offset, org_id in enumerate(new_ids):
+                self.index[org_id] = start + offset
+
+        # Organizations that were refreshed but no longer exist (or left the region) are deactivated
+        if organization_ids is not None:
+            found = {row.id for row in rows}
+            for org_id in set(organization_ids) - found:
+                row = self.index.get(org_id)
+                if row is not None:
+                    self.active[row] = False
+
+        refreshed = []
+        for org in rows:
+            i = self.index[org.id]
+            refreshed.append(i)
+            self.ids[i] = org.id
+            self.names[i] = org.name
+            self.active[i] = True
+            self.is_donor[i] = org.org_type == 'donor'
+            self.has_refrigeration[i] = bool(org.has_refrigeration)
+            self.has_freezer[i] = bool(org.has_freezer)
+            self.has_dry_storage[i] = bool(org.has_dry_storage)
+            self.capacity_kg[i] = np.nan if org.storage_capacity_kg is None else org.storage_capacity_kg
+            self.max_distance_km[i] = (
+                DEFAULT_MAX_DISTANCE_KM if org.max_pickup_distance_km is None else org.max_pickup_distance_km
+            )
+            self.acceptance_rate[i] = np.nan if org.acceptance_rate is None else org.acceptance_rate
+            self.latitude[i], self.longitude[i] = coordinates[org.id]
+
+        refreshed = np.array(refreshed, dtype=np.int64)
+        self.preferences[refreshed] = NO_PREFERENCE
+        self.has_preferences[refreshed] = False
+        self.allergen_mask[refreshed] = 0
+
+        for org_id, category, level in preferences:
+            i = self.index.get(org_id)
+            if i is None:
+                continue
+            self.preferences[i, self.category_column(category)] = 5 if level is None else level
+            self.has_preferences[i] = True
+
+        for org_id, allergen in allergens:
+            i = self.index.get(org_id)
+            if i is not None:
+                self.allergen_mask[i] |= self.allergen_bit(allergen)
+
+    def row(self, organization_id):
+        row = self.index.get(organization_id)
+        return row if row is not None and self.active[row] else None
+
+
+class SnapshotSource:
+    """
+    Publishes the current snapshot for one database engine. Changed
+    organizations are applied to a copy of the current snapshot, and a full
+    reload builds a new one; either way readers keep the snapshot they were
+    handed and the replacement is swapped in with a single assignment.
+    """
+
+    def __init__(self, geocode, max_age_seconds=MAX_AGE_SECONDS, region=None):
+        self.geocode = geocode
+        self.max_age_seconds = max_age_seconds
+        self.region = region
+        self.current = OrganizationSnapshot(geocode, region=region)
+        self.loaded_at = None
+        self.refresh_lock = threading.Lock()
+        # Separate from refresh_lock so marking never waits on a reload
+        self.dirty_lock = threading.Lock()
+        self.dirty = set()
+
+    def mark_changed(self, organization_ids):
+        with self.dirty_lock:
+            self.dirty.update(organization_ids)
+
+    def _take_dirty(self):
+        with self.dirty_lock:
+            changed = list(self.dirty)
+            self.dirty.clear()
+        return changed
+
+    def refresh(self, db):
+        """Load everything on first use or when stale, then apply only organizations marked changed"""
+        with self.refresh_lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age_seconds:
+                # Changes committed while loading stay marked and are applied next time
+                self._take_dirty()
+                fresh = OrganizationSnapshot(self.geocode, region=self.region)
+                fresh._apply(*fresh._load(db))
+                self.current = fresh
+                self.loaded_at = time.monotonic()
+            else:
+                changed = self._take_dirty()
+                if changed:
+                    updated = self.current.copy()
+                    updated._apply(*updated._load(db, changed), organization_ids=changed)
+                    self.current = updated
+            return self.current
+
+
+# One snapshot source per database engine, shared by every request in the worker
+_sources = {}
+_sources_lock = threading.Lock()
+
+# Set in shard workers so their snapshots only hold their region
+_region = None
+
+
+def set_region(region):
+    """Restrict this process's snapshots to a region (None for all organizations)"""
+    global _region
+    with _sources_lock:
+        _region = region
+        _sources.clear()
+
+
+def get_organization_snapshot(db, geocode):
+    bind = db.get_bind()
+    with _sources_lock:
+        source = _sources.get(bind)
+        if source is None:
+            source = _sources[bind] = SnapshotSource(geocode, region=_region)
+    return source.refresh(db)
+
+
+def mark_organizations_changed(db, organization_ids):
+    source = _sources.get(db.get_bind())
+    if source is not None:
+        source.mark_changed(organization_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_organizations(session, flush_context):
+    """Remember organizations whose matching-relevant rows changed in this flush"""
+    changed = session.info.setdefault("changed_organizations", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Organization):
+            changed.add(obj.id)
+        elif isinstance(obj, (FoodCategoryPreference, AllergenRestriction)):
+            changed.add(obj.organization_id)
+    changed.discard(None)
+
+
+@event.listens_for(Session, "after_commit")
+def mark_committed_organizations(session):
+    # Marked only once committed, so a concurrent refresh cannot read the old rows and clear the mark
+    changed = session.info.pop("changed_organizations", None)
+    if changed:
+        mark_organizations_changed(session, changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_organizations(session):
+    session.info.pop("changed_organizations", None)
@@ -0,0 +1,149 @@
+# tasks.py
+import logging
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from database import SessionLocal
+from models import Donation
+from matching_engine import MatchingEngine, NotificationEngine
+from jobqueue import get_queue
+import archive
+import profiling
+import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled archival runs; each run queues the next one
+ARCHIVE_INTERVAL = float(os.getenv("FOODBRIDGE_ARCHIVE_INTERVAL", str(24 * 3600)))
+SCHEDULED_ARCHIVAL_KEY = "archive_history:scheduled"
+
+# Payload key holding a profile mode ("cprofile" or "sampling"); the job's
+# profiled() calls (the MatchingEngine methods) are then saved as profiles.
+# Jobs queued while a request is being profiled get it automatically.
+PROFILE_KEY = "profile"
+
+# Job kind -> handler(db, **payload)
+HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+@job_handler("match_donation")
+def match_donation(db, donation_id):
+    notifications = MatchingEngine(db).create_notifications_for_donation(donation_id)
+    logger.info(f"Processed matches for donation {donation_id}: {len(notifications)} notifications")
+
+
+@job_handler("match_donations")
+def match_donations(db, donation_ids):
+    notifications = MatchingEngine(db).create_notifications_for_donations(donation_ids)
+    logger.info(f"Processed matches for {len(donation_ids)} donations: {len(notifications)} notifications")
+
+
+@job_handler("match_organization")
+def match_organization(db, organization_id):
+    notifications = MatchingEngine(db).match_existing_donations(organization_id)
+    logger.info(f"Matched existing donations for organization {organization_id}: {len(notifications)} notifications")
+
+
+@job_handler("expire_donations")
+def expire_donations(db):
+    expired = db.query(Donation).filter(
+        Donation.status == "available",
+        Donation.available_until < datetime.utcnow()
+    ).update({"status": "expired"})
+    db.commit()
+    if expired:
+        # Bulk UPDATEs skip session events, so invalidate cached matches here
+        response_cache.cache.invalidate([response_cache.DONATIONS_TAG])
+    logger.info(f"Expired {expired} donations")
+
+
+@job_handler("generate_notifications")
+def generate_notifications(db):
+    NotificationEngine(db).generate_notifications()
+
+
+@job_handler("archive_history")
+def archive_history(db):
+    moved = archive.archive(db)
+    logger.info(f"Archived rows: {moved}")
+    schedule_archival(delay=ARCHIVE_INTERVAL)
+
+
+def run_job(job):
+    """Run one claimed job in a fresh session owned by the worker"""
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        raise ValueError(f"No handler for job kind {job.kind!r}")
+    payload = dict(job.payload or {})
+    mode = profiling.parse_profile_flag(payload.pop(PROFILE_KEY, None))
+    db = SessionLocal()
+    try:
+        with profiling.request_profile(mode) if mode else nullcontext() as profile:
+            handler(db, **payload)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if profile is not None and profile.saved:
+        logger.info(f"Saved profiles for {job}: {', '.join(profile.saved)}")
+    return profile
+
+
+# --------------------------
+# Enqueue helpers used by the API
+# --------------------------
+
+def _payload(**fields):
+    """Job payload, carrying the profile mode when the caller is being profiled"""
+    mode = profiling.requested_mode()
+    if mode is not None:
+        fields[PROFILE_KEY] = mode
+    return fields
+
+
+def enqueue_donation_matching(donation_ids, queue=None):
+    """Queue matching for donations; repeats for a donation still waiting coalesce"""
+    return (queue or get_queue()).enqueue_many([
+        ("match_donation", _payload(donation_id=donation_id), f"match_donation:{donation_id}")
+        for donation_id in donation_ids
+    ])
+
+
+def enqueue_batch_matching(donation_ids, queue=None):
+    """Queue one batched matching pass over a set of donations, e.g. a bulk upload"""
+    return (queue or get_queue()).enqueue("match_donations", _payload(donation_ids=list(donation_ids)))
+
+
+def enqueue_organization_matching(organization_id, queue=None):
+    return (queue or get_queue()).enqueue(
+        "match_organization", _payload(organization_id=organization_id), f"match_organization:{organization_id}"
+    )
+
+
+def enqueue_expiration(queue=None):
+    return (queue or get_queue()).enqueue("expire_donations", _payload(), dedupe_key="expire_donations")
+
+
+def enqueue_notification_generation(queue=None):
+    return (queue or get_queue()).enqueue("generate_notifications", _payload(), dedupe_key="generate_notifications")
+
+
+def enqueue_archival(queue=None):
+    return (queue or get_queue()).enqueue("archive_history", _payload(), dedupe_key="archive_history")
+
+
+def schedule_archival(queue=None, delay=0.0):
+    """
+    Queue the periodic archival run unless one is already scheduled. Kept
+    apart from enqueue_archival so a manual run is never held back by the
+    next scheduled one.
+    """
+    return (queue or get_queue()).enqueue("archive_history", dedupe_key=SCHEDULED_ARCHIVAL_KEY, delay=delay)
@@ -0,0 +1,182 @@
+# worker.py
+import argparse
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from jobqueue import get_queue, JOB_QUEUE_URL, DEFAULT_VISIBILITY_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Seconds between housekeeping passes: purging finished jobs from the queue
+# and making sure the periodic archival job is scheduled
+PURGE_INTERVAL = float(os.getenv("FOODBRIDGE_JOB_PURGE_INTERVAL", "3600"))
+
+# Process roles: every job, the shard coordinator, or one shard's matching jobs
+GENERAL, COORDINATOR, SHARD = "general", "coordinator", "shard"
+
+
+def work(queue_url=JOB_QUEUE_URL, name=None, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+         poll_interval=1.0, kinds=None, max_jobs=None, stop=None, runner=None):
+    """
+    Claim and run jobs until stopped. Every job runs in its own database
+    session; failures are retried by the queue with exponential backoff.
+    Every PURGE_INTERVAL finished jobs past the queue's retention are purged
+    and, in workers that run archival, the next archival run is scheduled.
+    runner(job) defaults to tasks.run_job. Returns the number of jobs processed.
+    """
+    # Imported here so the parent process never opens database connections
+    from database import engine
+    from tasks import run_job, schedule_archival
+    engine.dispose()  # do not reuse connections inherited from the parent
+    runner = runner or run_job
+
+    queue = get_queue(queue_url)
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    purged_at = float("-inf")  # purge once on startup
+
+    while (stop is None or not stop.is_set()) and (max_jobs is None or processed < max_jobs):
+        if time.monotonic() - purged_at >= PURGE_INTERVAL:
+            purged_at = time.monotonic()
+            try:
+                removed = queue.purge()
+            except Exception as e:
+                logger.error(f"Purging finished jobs failed: {e}")
+            else:
+                if removed:
+                    logger.info(f"Purged {removed} finished jobs")
+            # Restarts the chain of self-scheduling archival jobs if it was
+            # never started or broke; coalesces with an already scheduled run
+            if runner is run_job and (kinds is None or "archive_history" in kinds):
+                schedule_archival(queue)
+
+        job = queue.claim(name, visibility_timeout, kinds)
+        if job is None:
+            if max_jobs is not None:
+                break  # draining: stop once the queue is empty
+            time.sleep(poll_interval)
+            continue
+
+        started = time.perf_counter()
+        try:
+            runner(job)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {e}")
+            if not queue.fail(job, e):
+                logger.warning(f"Job {job.id} was reclaimed by another worker; failure not recorded")
+        else:
+            if queue.complete(job):
+                logger.info(f"Job {job.id} ({job.kind}) done in {time.perf_counter() - started:.3f}s")
+            else:
+                logger.warning(f"Job {job.id} was reclaimed by another worker; result discarded")
+        processed += 1
+
+    return processed
+
+
+def work_as(role, queue_url=JOB_QUEUE_URL, shard=None, shards=1, kinds=None, **kwargs):
+    """
+    Run work() for a role. With shards > 1, general workers leave the
+    matching jobs to the coordinator, which forwards them to the shard
+    workers; see coordinator.py.
+    """
+    if role == GENERAL:
+        if shards > 1:
+            from coordinator import ROUTED_KINDS
+            from tasks import HANDLERS
+            kinds = [kind for kind in (kinds or HANDLERS) if kind not in ROUTED_KINDS]
+        return work(queue_url, kinds=kinds, **kwargs)
+
+    from coordinator import ROUTED_KINDS, route_job, start_shard
+    if role == COORDINATOR:
+        return work(queue_url, kinds=ROUTED_KINDS, runner=functools.partial(route_job, shards=shards), **kwargs)
+    if role == SHARD:
+        return work(start_shard(shard, shards), kinds=ROUTED_KINDS, **kwargs)
+    raise ValueError(f"Unknown worker role: {role}")
+
+
+def _worker_process(queue_url, label, role, shard, shards, visibility_timeout, poll_interval, kinds, stop):
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s {label} %(levelname)s %(message)s")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles shutdown
+    work_as(role, queue_url, shard, shards, kinds, name=f"{socket.gethostname()}:{os.getpid()}",
+            visibility_timeout=visibility_timeout, poll_interval=poll_interval, stop=stop)
+
+
+def run_pool(concurrency=2, queue_url=JOB_QUEUE_URL, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+             poll_interval=1.0, kinds=None, shards=1):
+    """
+    Run concurrency worker processes until interrupted; dead workers are
+    restarted. With shards > 1 a coordinator and one worker per shard are
+    started as well, so regional sharding can run on a single machine.
+    """
+    stop = multiprocessing.Event()
+    roles = [(f"worker-{index}", GENERAL, None) for index in range(concurrency)]
+    if shards > 1:
+        roles.append(("coordinator", COORDINATOR, None))
+        roles.extend((f"shard-{shard}", SHARD, shard) for shard in range(shards))
+    processes = {}
+
+    def spawn(index):
+        label, role, shard = roles[index]
+        process = multiprocessing.Process(
+            target=_worker_process,
+            args=(queue_url, label, role, shard, shards, visibility_timeout, poll_interval, kinds, stop),
+            daemon=True
+        )
+        process.start()
+        processes[index] = process
+
+    for index in range(len(roles)):
+        spawn(index)
+    try:
+        while True:
+            time.sleep(poll_interval)
+            for index, process in list(processes.items()):
+                if not process.is_alive():
+                    logger.warning(f"{roles[index][0]} exited with code {process.exitcode}; restarting")
+                    spawn(index)
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+    finally:
+        stop.set()
+        for process in processes.values():
+            process.join(timeout=visibility_timeout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run FoodBridge background job workers")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("FOODBRIDGE_WORKERS", "2")))
+    parser.add_argument("--queue", default=JOB_QUEUE_URL, help="job queue URL, e.g. sqlite:///./jobs.db")
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--kinds", default=None, help="comma-separated job kinds to run (default: all)")
+    parser.add_argument("--drain", action="store_true", help="run jobs in this process until the queue is empty")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("FOODBRIDGE_SHARDS", "1")),
+                        help="number of regional matching shards")
+    parser.add_argument("--coordinator", action="store_true",
+                        help="only route matching jobs to the shard queues")
+    parser.add_argument("--shard", type=int, default=None,
+                        help="only run this shard's matching jobs, e.g. one per node")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if os.getenv("FOODBRIDGE_CACHE_BACKEND", "memory") == "memory":
+        # See response_cache.CACHE_BACKEND
+        logger.warning("FOODBRIDGE_CACHE_BACKEND is 'memory': invalidations made by these workers will not "
+                       "reach the API's response cache; set it to a redis:// URL or keep FOODBRIDGE_CACHE_TTL short")
+    kinds = args.kinds.split(",") if args.kinds else None
+    if args.coordinator or args.shard is not None:
+        role = COORDINATOR if args.coordinator else SHARD
+        processed = work_as(role, args.queue, args.shard, args.shards, visibility_timeout=args.visibility_timeout,
+                            poll_interval=args.poll_interval, max_jobs=float("inf") if args.drain else None)
+        print(f"Processed {processed} jobs")
+    elif args.drain:
+        processed = work_as(GENERAL, args.queue, shards=args.shards, kinds=kinds,
+                            visibility_timeout=args.visibility_timeout, max_jobs=float("inf"))
+        print(f"Processed {processed} jobs")
+    else:
+        run_pool(args.concurrency, args.queue, args.visibility_timeout, args.poll_interval, kinds, args.shards)
@@ -3,25 +3,20 @@ from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
 import numpy as np
 import pandas as pd
+from windowing import windows_from_frame, FEATURE_COLUMNS
 
-orders = pd.read_csv("cleaned_orders.csv")
+orders = pd.read_parquet("cleaned_orders.parquet")
 
-X = []
-y = []
-time_steps = 5  
+time_steps = 5
+horizon = 1
 
-for i in range(len(orders) - time_steps):
-    X.append(orders.iloc[i:i+time_steps][["quantity_available", "temperature"]].values)
-    y.append(orders.iloc[i+time_steps]["claimed_count"])
-
-X = np.array(X)
-y = np.array(y)
+X, y = windows_from_frame(orders, FEATURE_COLUMNS, "claimed_count", time_steps, horizon)
 
 split = int(0.8 * len(X))
 X_train, X_test, y_train, y_test = X[:split], X[split:], y[:split], y[split:]
 
 model = Sequential([
-    LSTM(50, activation='relu', return_sequences=True, input_shape=(time_steps, 2)),
+    LSTM(50, activation='relu', return_sequences=True, input_shape=(time_steps, len(FEATURE_COLUMNS))),
     LSTM(50, activation='relu'),
     Dense(1)
 ])
@@ -0,0 +1,275 @@
+# serving.py
+from fastapi import FastAPI, HTTPException, status
+from pydantic import BaseModel
+from typing import List
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+import numpy as np
+import tensorflow as tf
+from artifacts import ArtifactRegistry
+from features import FeaturePipeline, PIPELINE_PATH
+
+DEMAND_MODEL_PATH = "demand_forecast.h5"
+PRICING_MODEL_NAME = "pricing"
+
+# Raw feature order expected from clients; scaled with the shared pipeline
+DEMAND_FEATURES = ["quantity_available", "temperature"]
+DEMAND_TARGET = "claimed_count"
+PRICE_FEATURES = ["claimed_count", "days_to_expiry", "temperature"]
+PRICE_TARGET = "price"
+
+# How long a batch waits for more requests before it is sent to the model
+MAX_BATCH_WAIT_MS = 5
+MAX_BATCH_SIZE = 1024
+
+# Price requests are quantized to these bucket widths (in raw units) and cached
+PRICE_BUCKET_WIDTHS = np.array([1.0, 1.0, 0.5])  # claims, days, degrees C
+PRICE_CACHE_SIZE = 100_000
+PRICE_CACHE_TTL_SECONDS = 15 * 60
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="FoodShare Inference API",
+    description="Resident demand forecasting and dynamic pricing models",
+    version="1.0.0"
+)
+
+
+class BatchPredictor:
+    """
+    Coalesces concurrent predict requests into a single model call.
+    Each request submits a block of rows; rows that arrive within
+    max_wait_ms of each other are stacked and predicted together.
+    """
+
+    def __init__(self, predict_fn, max_wait_ms=MAX_BATCH_WAIT_MS, max_batch_size=MAX_BATCH_SIZE):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue = None
+        self.worker = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future))
+        return await future
+
+    async def _collect(self):
+        rows, future = await self.queue.get()
+        pending = [(rows, future)]
+        size = len(rows)
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                rows, future = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append((rows, future))
+            size += len(rows)
+
+        return pending
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._collect()
+            batch = np.concatenate([rows for rows, _ in pending])
+            try:
+                # Run the model off the event loop so new requests keep queueing
+                predictions = await loop.run_in_executor(None, self.predict_fn, batch)
+            except Exception as e:
+                logger.error(f"Batch prediction failed: {str(e)}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for rows, future in pending:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after ttl seconds
+    """
+
+    def __init__(self, maxsize=PRICE_CACHE_SIZE, ttl=PRICE_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+class DemandRequest(BaseModel):
+    # One window per item: time_steps rows of [quantity_available, temperature]
+    windows: List[List[List[float]]]
+
+class PriceRequest(BaseModel):
+    # One row per item: [claimed_count, days_to_expiry, temperature]
+    items: List[List[float]]
+
+class PredictionResponse(BaseModel):
+    predictions: List[float]
+
+
+demand_model = None
+pricing_artifact = None
+feature_pipeline = None
+demand_batcher = None
+price_batcher = None
+price_cache = TTLCache()
+
+
+def predict_demand(batch):
+    return demand_model.predict_on_batch(batch).reshape(-1)
+
+def predict_price(batch):
+    return pricing_artifact.get().predict(batch)
+
+
+@app.on_event("startup")
+async def load_models():
+    """Load both models once and warm them with a dummy prediction"""
+    global demand_model, pricing_artifact, feature_pipeline, demand_batcher, price_batcher
+
+    feature_pipeline = FeaturePipeline.load(PIPELINE_PATH)
+
+    demand_model = tf.keras.models.load_model(DEMAND_MODEL_PATH, compile=False)
+    # Hot-reloaded when a new version is registered
+    pricing_artifact = ArtifactRegistry().live(PRICING_MODEL_NAME)
+
+    # The first call builds the TF graph and touches every tree; pay that cost here
+    _, time_steps, features = demand_model.input_shape
+    predict_demand(np.zeros((1, time_steps, features), dtype=np.float32))
+    predict_price(np.zeros((1, pricing_artifact.get().n_features_in_)))
+
+    demand_batcher = BatchPredictor(predict_demand)
+    price_batcher = BatchPredictor(predict_price)
+    demand_batcher.start()
+    price_batcher.start()
+    logger.info("Inference models loaded and warmed")
+
+@app.on_event("shutdown")
+async def stop_batchers():
+    await demand_batcher.stop()
+    await price_batcher.stop()
+
+
+@app.post("/predict/demand", response_model=PredictionResponse, tags=["Prediction"])
+async def predict_demand_endpoint(request: DemandRequest):
+    """Predict claimed count for a batch of feature windows"""
+    windows = np.asarray(request.windows, dtype=np.float32)
+    if windows.ndim != 3 or windows.shape[1:] != tuple(demand_model.input_shape[1:]):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Expected windows of shape (n, {demand_model.input_shape[1]}, {demand_model.input_shape[2]})"
+        )
+    windows = feature_pipeline.scale(windows, DEMAND_FEATURES).astype(np.float32)
+    predictions = await demand_batcher.predict(windows)
+    # The model predicts scaled claimed_count; return item counts
+    predictions = np.clip(feature_pipeline.unscale(predictions[..., None], [DEMAND_TARGET])[..., 0], 0, None)
+    return {"predictions": predictions.tolist()}
+
+@app.post("/predict/price", response_model=PredictionResponse, tags=["Prediction"])
+async def predict_price_endpoint(request: PriceRequest):
+    """Recommend prices for a batch of items, reusing cached prices for repeated feature buckets"""
+    items = np.asarray(request.items, dtype=np.float64)
+    n_features = pricing_artifact.get().n_features_in_
+    if items.ndim != 2 or items.shape[1] != n_features:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Expected rows of {n_features} features"
+        )
+    predictions = await cached_price_predictions(items)
+    return {"predictions": predictions.tolist()}
+
+@app.get("/predict/price/cache", tags=["Prediction"])
+def price_cache_stats():
+    """Hit/miss counters for the price bucket cache"""
+    return price_cache.stats()
+
+
+async def cached_price_predictions(items):
+    """
+    Quantize items into feature buckets, serve known buckets from the cache
+    and send only the distinct missing buckets to one batched predict call.
+    Predictions are made at the bucket centre so a bucket's price does not
+    depend on which item happened to fill it first.
+    """
+    # get() refreshes the artifact, so a newly registered model misses the old entries
+    pricing_artifact.get()
+    version = pricing_artifact.version
+    buckets = np.round(items / PRICE_BUCKET_WIDTHS).astype(np.int64)
+    unique_buckets, inverse = np.unique(buckets, axis=0, return_inverse=True)
+
+    prices = np.empty(len(unique_buckets))
+    missing = []
+    for i, bucket in enumerate(map(tuple, unique_buckets)):
+        price = price_cache.get((version, bucket))
+        if price is None:
+            missing.append(i)
+        else:
+            prices[i] = price
+
+    if missing:
+        centres = unique_buckets[missing] * PRICE_BUCKET_WIDTHS
+        predicted = await price_batcher.predict(feature_pipeline.scale(centres, PRICE_FEATURES))
+        # The model is trained on scaled prices; cache and return raw ones
+        predicted = feature_pipeline.unscale(predicted[..., None], [PRICE_TARGET])[..., 0]
+        prices[missing] = predicted
+        for i, price in zip(missing, predicted):
+            price_cache.set((version, tuple(unique_buckets[i])), float(price))
+
+    return prices[inverse.reshape(-1)]
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8001)
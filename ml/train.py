@@ -0,0 +1,157 @@
+# train.py
+import argparse
+import json
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import RandomizedSearchCV, train_test_split
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import LSTM, Dense
+from artifacts import ArtifactRegistry, data_hash
+from windowing import window_dataset, FEATURE_COLUMNS, TARGET_COLUMN
+
+DATA_PATH = "cleaned_orders.parquet"
+RUN_LOG_PATH = "training_runs.jsonl"
+
+PRICE_FEATURES = ["claimed_count", "days_to_expiry", "temperature"]
+PRICE_TARGET = "price"
+
+PRICE_PARAM_SPACE = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [None, 8, 16, 32],
+    "min_samples_leaf": [1, 2, 5, 10],
+    "max_features": [1.0, "sqrt", 0.5],
+}
+
+
+def record_run(run, path=RUN_LOG_PATH):
+    run["finished_at"] = datetime.utcnow().isoformat()
+    with open(path, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    print(json.dumps(run, indent=2))
+    return run
+
+
+def train_pricing(data_path=DATA_PATH, n_iter=20, cv=3, n_jobs=-1, seed=42):
+    """
+    Cross-validated random search over forest parameters.
+    Candidates are fitted in parallel across a process pool; each candidate
+    builds its trees single-threaded to avoid oversubscribing cores, and the
+    best configuration is refit with parallel tree building.
+    """
+    started = time.perf_counter()
+    orders = pd.read_parquet(data_path, columns=PRICE_FEATURES + [PRICE_TARGET])
+    X = orders[PRICE_FEATURES]
+    y = orders[PRICE_TARGET]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+
+    search = RandomizedSearchCV(
+        RandomForestRegressor(n_jobs=1, random_state=seed),
+        PRICE_PARAM_SPACE,
+        n_iter=n_iter,
+        cv=cv,
+        scoring="neg_mean_absolute_error",
+        n_jobs=n_jobs,
+        refit=False,
+        random_state=seed,
+    )
+    search.fit(X_train, y_train)
+    search_seconds = time.perf_counter() - started
+
+    fit_started = time.perf_counter()
+    model = RandomForestRegressor(n_jobs=n_jobs, random_state=seed, **search.best_params_)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_started
+
+    predictions = model.predict(X_test)
+    version = ArtifactRegistry().save(
+        "pricing", model, data_hash(data_path),
+        {"features": PRICE_FEATURES, "params": search.best_params_}
+    )
+
+    wall_seconds = time.perf_counter() - started
+    return record_run({
+        "model": "pricing",
+        "version": version,
+        "rows": len(orders),
+        "params": search.best_params_,
+        "candidates": n_iter,
+        "cv_fits": n_iter * cv,
+        "search_seconds": search_seconds,
+        "fit_seconds": fit_seconds,
+        "wall_seconds": wall_seconds,
+        "rows_per_second": len(X_train) / fit_seconds,
+        "cv_mae": -search.best_score_,
+        "test_mae": mean_absolute_error(y_test, predictions),
+        "test_r2": r2_score(y_test, predictions),
+    })
+
+
+def train_demand(data_path=DATA_PATH, time_steps=5, horizon=1, batch_size=1024, epochs=20,
+                 validation_fraction=0.2, chunksize=100_000, output_path="demand_forecast.h5"):
+    """
+    Train the LSTM from a streamed, batched and prefetched tf.data pipeline.
+    The trailing validation_fraction of windows is held out for validation.
+    """
+    started = time.perf_counter()
+    rows = pq.ParquetFile(data_path).metadata.num_rows
+    windows = max(rows - time_steps - horizon + 1, 0)
+    val_batches = max(1, int(np.ceil(windows * validation_fraction / batch_size)))
+    train_batches = max(1, int(np.ceil(windows / batch_size)) - val_batches)
+
+    # Split the file by row once: window i covers rows i..i+time_steps+horizon-1,
+    # so the training rows end where the last training window does and the
+    # validation rows start at the first validation window. Validation then
+    # reads only its own rows each epoch instead of skipping past the rest.
+    train_windows = min(windows, train_batches * batch_size)
+    train_data = window_dataset(data_path, FEATURE_COLUMNS, TARGET_COLUMN, time_steps, horizon,
+                                chunksize=chunksize, batch_size=batch_size,
+                                stop=train_windows + time_steps + horizon - 1)
+    val_data = window_dataset(data_path, FEATURE_COLUMNS, TARGET_COLUMN, time_steps, horizon,
+                              chunksize=chunksize, batch_size=batch_size, start=train_windows)
+
+    model = Sequential([
+        LSTM(50, activation='relu', return_sequences=True, input_shape=(time_steps, len(FEATURE_COLUMNS))),
+        LSTM(50, activation='relu'),
+        Dense(1)
+    ])
+    model.compile(optimizer='adam', loss='mse')
+
+    fit_started = time.perf_counter()
+    history = model.fit(train_data, epochs=epochs, validation_data=val_data)
+    fit_seconds = time.perf_counter() - fit_started
+
+    model.save(output_path)
+
+    return record_run({
+        "model": "demand",
+        "rows": rows,
+        "batch_size": batch_size,
+        "epochs": epochs,
+        "fit_seconds": fit_seconds,
+        "wall_seconds": time.perf_counter() - started,
+        "windows_per_second": train_windows * epochs / fit_seconds,
+        "train_loss": history.history["loss"][-1],
+        "val_loss": history.history["val_loss"][-1],
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the pricing and demand models")
+    parser.add_argument("--model", choices=["pricing", "demand", "all"], default="all")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--n-iter", type=int, default=20)
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--epochs", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.model in ("pricing", "all"):
+        train_pricing(args.data, args.n_iter, args.cv, args.jobs)
+    if args.model in ("demand", "all"):
+        train_demand(args.data, batch_size=args.batch_size, epochs=args.epochs)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATURE_COLUMNS = ["quantity_available", "temperature"]
+TARGET_COLUMN = "claimed_count"
+
+
+def make_windows(values, targets, time_steps=5, horizon=1):
+    """
+    Build (N, time_steps, features) windows over an ordered feature matrix.
+    The windows are strided views into `values`, so no rows are copied.
+    Window i covers rows i..i+time_steps-1 and is paired with the target
+    `horizon` rows after its last row.
+    """
+    values = np.asarray(values)
+    targets = np.asarray(targets)
+
+    count = len(values) - time_steps - horizon + 1
+    if count <= 0:
+        return (np.empty((0, time_steps, values.shape[1]), dtype=values.dtype),
+                np.empty((0,), dtype=targets.dtype))
+
+    # sliding_window_view appends the window axis last: (T', F, time_steps)
+    X = sliding_window_view(values, time_steps, axis=0).transpose(0, 2, 1)[:count]
+    y = targets[time_steps + horizon - 1:time_steps + horizon - 1 + count]
+    return X, y
+
+
+def windows_from_frame(frame, feature_columns=FEATURE_COLUMNS, target_column=TARGET_COLUMN,
+                       time_steps=5, horizon=1):
+    """
+    Window a DataFrame of orders using the given feature and target columns
+    """
+    values = frame[feature_columns].to_numpy(dtype=np.float32)
+    targets = frame[target_column].to_numpy(dtype=np.float32)
+    return make_windows(values, targets, time_steps, horizon)
+
+
+def iter_chunk_windows(chunks, feature_columns=FEATURE_COLUMNS, target_column=TARGET_COLUMN,
+                       time_steps=5, horizon=1):
+    """
+    Yield (X, y) window arrays from an iterable of ordered DataFrame chunks.
+    The last time_steps + horizon - 1 rows of each chunk are carried over so
+    windows spanning a chunk boundary are not lost.
+    """
+    overlap = time_steps + horizon - 1
+    carry_values = None
+    carry_targets = None
+
+    for chunk in chunks:
+        values = chunk[feature_columns].to_numpy(dtype=np.float32)
+        targets = chunk[target_column].to_numpy(dtype=np.float32)
+
+        if carry_values is not None:
+            values = np.concatenate([carry_values, values])
+            targets = np.concatenate([carry_targets, targets])
+
+        X, y = make_windows(values, targets, time_steps, horizon)
+        if len(X):
+            yield X, y
+
+        carry_values = values[-overlap:]
+        carry_targets = targets[-overlap:]
+
+
+def _read_parquet_rows(path, columns, chunksize, start, stop):
+    # Only decode the row groups overlapping [start, stop)
+    parquet = pq.ParquetFile(path)
+    row_groups = []
+    first_row = None
+    offset = 0
+    for i in range(parquet.num_row_groups):
+        group_rows = parquet.metadata.row_group(i).num_rows
+        if offset + group_rows > start and (stop is None or offset < stop):
+            row_groups.append(i)
+            first_row = offset if first_row is None else first_row
+        offset += group_rows
+    if not row_groups:
+        return
+
+    position = first_row
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns, row_groups=row_groups):
+        chunk = batch.to_pandas()
+        begin = max(start - position, 0)
+        end = len(chunk) if stop is None else min(stop - position, len(chunk))
+        position += len(chunk)
+        if end > begin:
+            yield chunk.iloc[begin:end]
+        if stop is not None and position >= stop:
+            return
+
+
+def read_chunks(path, columns, chunksize=100_000, start=0, stop=None):
+    """
+    Read rows [start, stop) of a CSV or Parquet file as a stream of DataFrame chunks
+    """
+    if path.endswith(".parquet"):
+        yield from _read_parquet_rows(path, columns, chunksize, start, stop)
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize,
+                               skiprows=range(1, start + 1),
+                               nrows=None if stop is None else max(stop - start, 0))
+
+
+def iter_file_windows(path, feature_columns=FEATURE_COLUMNS, target_column=TARGET_COLUMN,
+                      time_steps=5, horizon=1, chunksize=100_000, start=0, stop=None):
+    """
+    Yield (X, y) window arrays chunk by chunk from a file that may not fit in memory,
+    using only rows [start, stop)
+    """
+    chunks = read_chunks(path, list(feature_columns) + [target_column], chunksize, start, stop)
+    yield from iter_chunk_windows(chunks, feature_columns, target_column, time_steps, horizon)
+
+
+def window_dataset(path, feature_columns=FEATURE_COLUMNS, target_column=TARGET_COLUMN,
+                   time_steps=5, horizon=1, chunksize=100_000, batch_size=256,
+                   shuffle_buffer=None, start=0, stop=None):
+    """
+    Stream windows from a CSV or Parquet file through a batched, prefetched tf.data pipeline.
+    start/stop restrict it to a row range, e.g. to split off a validation set
+    without reading the training rows again.
+    """
+    signature = (
+        tf.TensorSpec(shape=(None, time_steps, len(feature_columns)), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )
+    dataset = tf.data.Dataset.from_generator(
+        lambda: iter_file_windows(path, feature_columns, target_column, time_steps, horizon,
+                                  chunksize, start, stop),
+        output_signature=signature,
+    ).unbatch()
+
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer)
+
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)